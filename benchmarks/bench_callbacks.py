@@ -0,0 +1,91 @@
+"""Per-callback dispatch cost: regex filter + if/elif chain vs CallbackRouter.
+
+Both sides run the same no-op handlers, so the numbers are pure routing
+overhead: the Pyrogram filter check plus finding (and admin-guarding) the
+handler. Actions are drawn uniformly from the bot's callback actions, so
+the legacy chain pays its average position in the elif list.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_callbacks
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyrogram import filters
+
+from benchmarks.stub_client import StubClient
+from services.callback_router import CallbackRouter
+
+CALLBACKS = 50000
+ADMIN = 1
+
+# Order of the branches in the old handle_callbacks chain
+PUBLIC = ["back_to_settings", "check_sub", "already_joined", "contact_info", "about", "close_settings"]
+ADMIN_ONLY = ["admin_settings", "file_settings", "channel_settings", "bot_settings", "show_stats",
+              "toggle_bulk", "toggle_auto", "toggle_maintenance",
+              "set_image", "set_caption", "set_storage", "set_force_sub", "set_file_size"]
+LEGACY_REGEX = filters.regex(f"^({'|'.join(PUBLIC + ADMIN_ONLY)})$")
+
+
+def is_admin(user_id):
+    return user_id == ADMIN
+
+
+async def handler(client, callback_query):
+    return None
+
+
+async def legacy_dispatch(client, query):
+    data = query.data
+    for action in PUBLIC:
+        if data == action:
+            return await handler(client, query)
+    for action in ADMIN_ONLY:
+        if data == action:
+            if is_admin(query.from_user.id):
+                return await handler(client, query)
+            return await query.answer("denied")
+
+
+def build_router():
+    router = CallbackRouter(is_admin)
+    router.route(*PUBLIC)(handler)
+    router.route(*ADMIN_ONLY, admin=True)(handler)
+    return router
+
+
+async def bench(label, client, queries, check, dispatch):
+    start = time.perf_counter()
+    for query in queries:
+        if await check(client, query):
+            await dispatch(client, query)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {elapsed / len(queries) * 1e6:8.2f} µs/callback  ({len(queries) / elapsed:,.0f}/s)")
+    return elapsed
+
+
+async def run():
+    client = StubClient(latency=0)
+    rng = random.Random(42)
+    actions = PUBLIC + ADMIN_ONLY
+    queries = [client.callback_query(ADMIN, rng.choice(actions)) for _ in range(CALLBACKS)]
+    router = build_router()
+
+    print(f"{CALLBACKS} callbacks over {len(actions)} actions\n")
+    legacy = await bench("regex + if/elif", client, queries, LEGACY_REGEX, legacy_dispatch)
+    routed = await bench("CallbackRouter", client, queries, router.filter, router.dispatch)
+    print(f"\nspeedup {legacy / routed:.1f}x")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
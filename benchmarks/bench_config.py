@@ -0,0 +1,71 @@
+"""Per-message admin config cost: disk read per call vs in-memory snapshot.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_config
+"""
+import json
+import os
+import tempfile
+import time
+
+from services.config_store import ConfigStore
+
+# One upload through handle_settings_input used to read the config this often
+READS_PER_MESSAGE = 5
+MESSAGES = 20000
+
+
+def legacy_load(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def bench(label, per_message):
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        per_message()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20} {elapsed / MESSAGES * 1e6:8.2f} µs/message  ({MESSAGES / elapsed:,.0f} msg/s)")
+    return elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "admin_config.json")
+        config = {
+            "admins": 1,
+            "force_sub_channel": "@channel",
+            "storage_channel": -1001,
+            "welcome_image": "welcome_image.jpg",
+            "welcome_caption": "Hello {user_mention}!" * 10,
+            "bulk_mode": False,
+            "auto_accept": True,
+            "maintenance_mode": False,
+            "max_file_size": 4096
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=4)
+
+        def legacy_message():
+            for _ in range(READS_PER_MESSAGE):
+                legacy_load(path)
+
+        store = ConfigStore(path, dict)
+
+        def cached_message():
+            store.get_bool("maintenance_mode")
+            store.get_int("admins")
+            store.get_int("max_file_size")
+            store.get_bool("bulk_mode")
+            store.get_int("admins")
+
+        before = bench("load_admin_config", legacy_message)
+        after = bench("ConfigStore", cached_message)
+        print(f"speedup: {before / after:.1f}x, reloads: {store.reloads}")
+
+
+if __name__ == "__main__":
+    main()
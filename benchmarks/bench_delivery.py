@@ -0,0 +1,65 @@
+"""Multi-file delivery: per-message copy_message + react vs bulk copy batches.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_delivery
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "benchmark")
+os.environ.setdefault("BOT_TOKEN", "1:benchmark")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+from benchmarks.stub_client import StubClient, isolated_bot_state
+from services.delivery import DeliveryEngine
+
+USERS = 50
+FILES_PER_REQUEST = 50
+LATENCY = 0.02
+
+
+async def per_message(client, chat_id, file_ids):
+    import main
+
+    for file_id in file_ids:
+        await main.send_requested_file(client, chat_id, file_id)
+
+
+async def run(label, deliver):
+    client = StubClient(latency=LATENCY)
+    file_ids = list(range(1, FILES_PER_REQUEST + 1))
+    start = time.perf_counter()
+    await asyncio.gather(*(deliver(client, 10_000 + u, file_ids) for u in range(USERS)))
+    elapsed = time.perf_counter() - start
+    files = USERS * FILES_PER_REQUEST
+    calls = sum(client.calls.values())
+    print(f"{label:<12} {files / elapsed:10,.0f} files/s  {calls:6d} API calls  ({calls / USERS:.1f} per request)")
+    return files / elapsed
+
+
+async def run_all():
+    import main
+
+    print(f"{USERS} concurrent requests x {FILES_PER_REQUEST} files, {LATENCY * 1000:.0f} ms per API call")
+    before = await run("per-message", per_message)
+    engine = DeliveryEngine()
+
+    async def bulk(client, chat_id, file_ids):
+        await engine.deliver(client, chat_id, main.STORAGE_CHANNEL, file_ids)
+
+    after = await run("bulk", bulk)
+    print(f"speedup: {after / before:.1f}x")
+
+
+def main():
+    with isolated_bot_state():
+        asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
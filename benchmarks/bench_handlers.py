@@ -0,0 +1,135 @@
+"""End-to-end handler benchmarks against the offline stub client.
+
+Drives the real handlers from main.py (start_command, handle_settings_input
+-> handle_file, handle_callbacks, send_requested_file) with concurrent
+synthetic updates and reports, per scenario, throughput, p50/p99 handler
+latency and Telegram API calls per operation. All state (admin config,
+SQLite indexes, outbox) lives in a temporary directory, so the run needs
+no bot token or network and leaves the working tree untouched.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_handlers [--ops 2000] [--concurrency 100]
+        [--latency 0.02] [--error-rate 0.0]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "benchmark")
+os.environ.setdefault("BOT_TOKEN", "1:benchmark")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+from benchmarks.stub_client import StubClient, isolated_bot_state
+
+USERS = 5000
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+async def run_scenario(name, client, make_op, ops, concurrency):
+    """Run ``ops`` operations, at most ``concurrency`` at a time"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    calls_before = sum(client.calls.values())
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await make_op(i)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(ops)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    calls = sum(client.calls.values()) - calls_before
+    print(f"{name:<22} {ops / elapsed:8.0f} ops/s  "
+          f"p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.2f} ms  "
+          f"{calls / ops:5.2f} API calls/op"
+          + (f"  ({errors} errors)" if errors else ""))
+
+
+async def benchmark(args):
+    import main
+    from handlers.admin_handler import DEFAULT_ADMIN, config_store
+    from services.link_generator import encode_file_id
+
+    errors = {"copy_message": args.error_rate, "messages.ForwardMessages": args.error_rate} if args.error_rate else None
+    members = set(range(1, USERS // 2 + 1)) | {DEFAULT_ADMIN}
+    client = StubClient(latency=args.latency, members=members, errors=errors, seed=42)
+    await main.bot_identity.load(client)
+    await main.storage_target.resolve(client)
+    ops, concurrency = args.ops, args.concurrency
+
+    print(f"{ops} ops per scenario, concurrency {concurrency}, "
+          f"API latency {args.latency * 1000:.0f} ms, error rate {args.error_rate:.0%}\n")
+
+    def start(user_id, link):
+        return main.start_command(client, client.message(user_id, user_id, text=f"/start {link}"))
+
+    # Subscribed users opening a single-file deep link (repeat visitors hit the caches)
+    await run_scenario("start (subscribed)", client,
+                       lambda i: start(1 + i % (USERS // 2), encode_file_id(100 + i % 50)), ops, concurrency)
+
+    # Non-subscribed visitors: welcome photo + join prompt, request kept for later
+    await run_scenario("start (not joined)", client,
+                       lambda i: start(USERS // 2 + 1 + i % (USERS // 2), encode_file_id(100)), ops, concurrency)
+
+    # Uploads through the private-message handler; every 4th file re-uploads
+    # one stored a few hundred uploads earlier
+    def upload(i):
+        unique_id = f"u{i - 399}" if i % 4 == 3 and i >= 400 else f"u{i}"
+        document = client.document(unique_id, f"upload {i}.mkv")
+        return main.handle_settings_input(client, client.message(1 + i % 100, 1 + i % 100, document=document))
+    await run_scenario("upload", client, upload, ops, concurrency)
+
+    # "Try Again" after joining: delivers the pending deep-link request
+    def try_again(i):
+        user_id = 1 + i % (USERS // 2)
+        main.user_requests[user_id] = [100 + i % 50]
+        return main.handle_callbacks(client, client.callback_query(user_id, "check_sub"))
+    await run_scenario("callback check_sub", client, try_again, ops, concurrency)
+
+    await run_scenario("callback admin menu", client,
+                       lambda i: main.handle_callbacks(client, client.callback_query(DEFAULT_ADMIN, "admin_settings")),
+                       ops, concurrency)
+
+    await run_scenario("send_requested_file", client,
+                       lambda i: main.send_requested_file(client, 1 + i % USERS, 100 + i % 50), ops, concurrency)
+
+    main.file_index.flush()
+    config_store.flush()
+    print(f"\nAPI calls by method: {dict(client.calls.most_common())}")
+    if client.failures:
+        print(f"injected failures: {dict(client.failures)}, queued for retry: {main.outbox.pending()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub API latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of failing copy calls")
+    args = parser.parse_args()
+
+    with isolated_bot_state():
+        asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
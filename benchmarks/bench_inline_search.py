@@ -0,0 +1,96 @@
+"""Inline search latency against a large file index.
+
+Fills a throwaway index with synthetic file names (1M by default, pass a
+different count as the first argument) and times uncached searches for
+common, rare and missing substrings, plus paging and cached repeats.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_inline_search [rows]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from services.file_index import FileIndex
+
+ROWS = 1_000_000
+REPEATS = 200
+
+WORDS = ("movie", "series", "season", "episode", "lecture", "album", "track", "backup",
+         "report", "invoice", "python", "linux", "course", "tutorial", "ebook", "draft")
+EXTENSIONS = ("mkv", "mp4", "mp3", "pdf", "zip", "apk", "epub")
+QUERIES = {
+    "common": "movie",
+    "rare": "4242",
+    "rare combo": "lecture 4242",
+    "missing": "qwxzv",
+    "short ext": "epub",
+}
+
+
+def synthetic_rows(count, rng):
+    now = time.time()
+    for message_id in range(1, count + 1):
+        name = (f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.randrange(10000)}"
+                f".{rng.choice(EXTENSIONS)}")
+        yield (message_id, f"id{message_id}", 1, f"u{message_id}", name,
+               "application/octet-stream", rng.randrange(1 << 30), now)
+
+
+def fill(index, count):
+    rng = random.Random(42)
+    start = time.perf_counter()
+    batch = []
+    for row in synthetic_rows(count, rng):
+        batch.append(row)
+        if len(batch) == 10000:
+            index._pending = batch
+            index.flush()
+            batch = []
+    index._pending = batch
+    index.flush()
+    # Bulk-loaded segments are merged over time in production; start merged
+    index.db.execute("INSERT INTO files_search (files_search) VALUES ('optimize')")
+    print(f"indexed {count:,} files in {time.perf_counter() - start:.1f}s")
+
+
+def timed(func, repeats):
+    samples = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    with tempfile.TemporaryDirectory() as tmp:
+        index = FileIndex(os.path.join(tmp, "files.db"))
+        fill(index, rows)
+
+        for label, query in QUERIES.items():
+            def uncached(i, query=query):
+                index._search_cache.clear()
+                return index.search(query, limit=20, offset=0)
+            p50, p99 = timed(uncached, REPEATS)
+            found = len(index.search(query))
+            print(f"{label:<10} {query!r:<16} p50 {p50:6.2f} ms  p99 {p99:6.2f} ms  ({found} results/page)")
+
+        def paged(i):
+            index._search_cache.clear()
+            return index.search("movie", limit=20, offset=(i % 10) * 20)
+        p50, p99 = timed(paged, REPEATS)
+        print(f"{'pages 1-10':<10} {'movie':<16} p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+
+        p50, p99 = timed(lambda i: index.search("movie"), REPEATS * 10)
+        print(f"{'cached':<10} {'movie':<16} p50 {p50 * 1000:6.2f} µs  p99 {p99 * 1000:6.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Simulated-load test for the outbound scheduler.
+
+A fake Telegram enforces a global send limit and a per-chat limit and
+answers violations with FloodWait, the way the real API does. The same
+burst (many users each receiving several messages at once) is sent once
+directly, retrying after each FloodWait like Pyrogram does, and once
+through OutboundScheduler. Limits are scaled up 10x so the run is short.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rate_limiter
+"""
+import asyncio
+import time
+
+from services.rate_limiter import OutboundScheduler, TokenBucket
+
+SCALE = 10
+GLOBAL_RATE = 30 * SCALE
+CHAT_RATE = 1 * SCALE
+CHAT_BURST = 3
+USERS = 400
+MESSAGES_PER_USER = 5
+
+
+class SimFloodWait(Exception):
+    def __init__(self, value):
+        super().__init__(f"A wait of {value:.2f} seconds is required")
+        self.value = value
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self.chats = {}
+        self.delivered = 0
+        self.flood_waits = 0
+
+    async def send_message(self, chat_id):
+        now = time.monotonic()
+        chat = self.chats.setdefault(chat_id, TokenBucket(CHAT_RATE, CHAT_BURST))
+        for bucket in (self.global_bucket, chat):
+            wait = bucket.reserve(now)
+            if wait > 0:
+                # Rejected requests don't consume quota
+                bucket.tokens += 1
+                if bucket is chat:
+                    self.global_bucket.tokens += 1
+                self.flood_waits += 1
+                # Telegram penalises repeat offenders with longer waits
+                raise SimFloodWait(wait * 2 + 0.1)
+        await asyncio.sleep(0.005)
+        self.delivered += 1
+
+
+async def direct(telegram, chat_id):
+    for _ in range(5):
+        try:
+            return await telegram.send_message(chat_id)
+        except SimFloodWait as e:
+            await asyncio.sleep(e.value)
+
+
+async def run(label, send):
+    telegram = FakeTelegram()
+    jobs = [send(telegram, 1000 + u) for u in range(USERS) for _ in range(MESSAGES_PER_USER)]
+    start = time.perf_counter()
+    await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - start
+    total = USERS * MESSAGES_PER_USER
+    print(f"{label:<10} delivered {telegram.delivered}/{total} in {elapsed:5.2f}s "
+          f"({telegram.delivered / elapsed:6.0f} msg/s, limit {GLOBAL_RATE}/s), "
+          f"FloodWaits: {telegram.flood_waits}")
+
+
+async def main():
+    await run("direct", direct)
+
+    # Configured a little under the real limits to absorb scheduling jitter
+    scheduler = OutboundScheduler(
+        global_rate=GLOBAL_RATE * 2, send_rate=GLOBAL_RATE * 0.9,
+        private_rate=CHAT_RATE * 0.9, private_burst=CHAT_BURST - 1,
+        flood_wait_of=lambda e: e.value if isinstance(e, SimFloodWait) else None
+    )
+
+    async def scheduled(telegram, chat_id):
+        return await scheduler.call("SendMessage", chat_id, True, lambda: telegram.send_message(chat_id))
+
+    await run("scheduled", scheduled)
+    print(f"scheduler: {scheduler.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
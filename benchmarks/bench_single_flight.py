@@ -0,0 +1,91 @@
+"""Burst load test for single-flight coalescing of Telegram lookups.
+
+Simulates a shared link going viral: a burst of concurrent subscription
+checks (with repeat taps from the same users) and uploads, run once with
+coalescing disabled and once with it enabled. Reports API calls made.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_single_flight
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "benchmark")
+os.environ.setdefault("BOT_TOKEN", "1:benchmark")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import services.single_flight as single_flight_module
+from benchmarks.stub_client import StubClient, isolated_bot_state
+
+BURST_USERS = 300
+BURST_TAPS = 1000
+BURST_UPLOADS = 200
+
+
+class DirectFlight:
+    """Pass-through used to measure the uncoalesced baseline"""
+
+    async def do(self, key, func, *args, **kwargs):
+        return await func(*args, **kwargs)
+
+
+async def burst(client):
+    import main
+    from handlers.file_handler import handle_file
+
+    rng = random.Random(42)
+    main.membership_cache.clear()
+    checks = [main.check_subscription(client, rng.randrange(BURST_USERS)) for _ in range(BURST_TAPS)]
+    uploads = [
+        handle_file(client, client.message(chat_id=u, user_id=u, document=object()))
+        for u in range(1, BURST_UPLOADS + 1)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(*checks, *uploads)
+    return time.perf_counter() - start
+
+
+def use_flight(flight):
+    """Swap flight in everywhere the single_flight singleton was imported by name"""
+    for module in list(sys.modules.values()):
+        if isinstance(getattr(module, "single_flight", None), (single_flight_module.SingleFlight, DirectFlight)):
+            module.single_flight = flight
+
+
+async def run(label, flight):
+    # Imported before the swap so use_flight reaches every module
+    import main
+    from handlers.file_handler import storage_target
+    from services.bot_identity import bot_identity
+
+    # Both modes start cold: nothing the previous run looked up is reused
+    storage_target.invalidate()
+    bot_identity.invalidate()
+    use_flight(flight)
+    client = StubClient(latency=0.05)
+    elapsed = await burst(client)
+    lookups = {m: n for m, n in sorted(client.calls.items()) if m.startswith("get_")}
+    print(f"{label:<12} {sum(lookups.values()):6d} lookup calls in {elapsed:.2f}s  {lookups}")
+    return sum(lookups.values())
+
+
+async def run_all():
+    print(f"burst: {BURST_TAPS} subscription checks from {BURST_USERS} users + {BURST_UPLOADS} uploads")
+    before = await run("direct", DirectFlight())
+    after = await run("coalesced", single_flight_module.SingleFlight())
+    print(f"saved {before - after} of {before} API calls ({(before - after) / before:.0%})")
+
+
+def main():
+    with isolated_bot_state():
+        asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Replay recorded or synthetic update streams through the real handlers.
+
+Updates are fed open-loop at their original (or synthetic) timestamps into
+a queue drained by as many workers as the bot runs. Each worker dispatches
+the way Pyrogram's dispatcher does: walk ``app.dispatcher.groups`` in
+order, run the first handler per group whose filters match. So the exact
+registrations from main.py (filters, group order, the recorder in group
+-1 if enabled) decide what runs, against the offline stub client.
+
+Reports how long updates waited in the queue before a worker picked them
+up, end-to-end latency, and API calls per update.
+
+Run from the repository root, either on a log captured with
+RECORD_UPDATES=path:
+
+    python -m benchmarks.replay --log updates.jsonl [--speed 2]
+
+or on a synthetic burst of /start deep links:
+
+    python -m benchmarks.replay --rate 10000 --duration 1 --subscribed 0.8
+
+``--mirror`` pre-fills the membership mirror with every synthetic user, as
+on a bot that has been receiving the channel's join/leave updates.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "benchmark")
+os.environ.setdefault("BOT_TOKEN", "1:benchmark")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ.setdefault("METRICS_PORT", "0")
+
+from benchmarks.stub_client import StubClient, isolated_bot_state
+
+
+def synthetic_updates(rate, duration, users, stored_files, seed=42):
+    """``rate`` /start <deep link> messages per second from random users"""
+    from services.link_generator import encode_file_id
+
+    rng = random.Random(seed)
+    total = int(rate * duration)
+    for i in range(total):
+        user_id = rng.randint(1, users)
+        yield {"t": i / rate, "k": "m", "u": user_id, "c": user_id,
+               "x": f"/start {encode_file_id(rng.randint(1, stored_files))}"}
+
+
+def recorded_updates(path, speed):
+    from services.update_recorder import read_updates
+
+    first = None
+    for record in read_updates(path):
+        first = record["t"] if first is None else first
+        yield dict(record, t=(record["t"] - first) / speed)
+
+
+def build_update(client, record):
+    kind = record.get("k", "m")
+    user_id, chat_id = record.get("u"), record.get("c") or record.get("u")
+    if kind == "c":
+        return "callback", client.callback_query(user_id, record["d"], client.bot_message(chat_id))
+    if kind == "i":
+        return "inline", client.inline_query(user_id, record.get("q", ""), record.get("o", ""))
+    media = {}
+    if record.get("f"):
+        unique_id, name, size, _mime = record["f"]
+        media["document"] = client.document(unique_id, name or "file.bin", size or 0)
+    return "message", client.message(chat_id, user_id, text=record.get("x"), **media)
+
+
+def handler_types():
+    from pyrogram.handlers import MessageHandler, CallbackQueryHandler, InlineQueryHandler
+    return {"message": MessageHandler, "callback": CallbackQueryHandler, "inline": InlineQueryHandler}
+
+
+async def dispatch(app, client, kind, update, types):
+    """One update through the registered handlers, like Dispatcher.handler_worker"""
+    handled = False
+    for group in app.dispatcher.groups.values():
+        for handler in group:
+            if not isinstance(handler, types[kind]):
+                continue
+            if not await handler.check(client, update):
+                continue
+            await handler.callback(client, update)
+            handled = True
+            break
+    return handled
+
+
+def describe(label, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return (f"{label:<14} p50 {statistics.median(samples) * 1000:8.2f} ms  "
+            f"p99 {p99 * 1000:8.2f} ms  max {samples[-1] * 1000:8.2f} ms")
+
+
+async def replay(args):
+    import main
+
+    users = args.users
+    members = set(range(1, int(users * args.subscribed) + 1))
+    client = StubClient(latency=args.latency, members=members, seed=42)
+    await main.bot_identity.load(client)
+    await main.storage_target.resolve(client)
+    if args.mirror:
+        # The mirror only answers for the resolved force-sub channel
+        from handlers.admin_handler import config_store
+        config = dict(config_store.snapshot())
+        config["force_sub_peer"] = {"chat": str(config["force_sub_channel"]), "id": -100123,
+                                    "access_hash": 0, "type": "channel"}
+        config_store.save(config)
+        main.membership_mirror.activate(-100123)
+        for user_id in range(1, users + 1):
+            main.membership_mirror.observe(user_id, user_id in members)
+    # Let the handler registrations scheduled at import time run
+    await asyncio.sleep(0)
+
+    if args.log:
+        stream = recorded_updates(args.log, args.speed)
+        source = f"{args.log} at {args.speed}x"
+    else:
+        stream = synthetic_updates(args.rate, args.duration, users, args.files)
+        source = (f"synthetic /start burst: {args.rate}/s for {args.duration}s, "
+                  f"{args.subscribed:.0%} subscribed, {users} users")
+    workers = args.workers or main.app.workers
+    print(f"{source}, {workers} workers, stub API latency {args.latency * 1000:.0f} ms")
+
+    types = handler_types()
+    queue = asyncio.Queue()
+    queue_delays, latencies = [], []
+    counts = {"handled": 0, "unhandled": 0, "errors": 0}
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            enqueued, kind, update = item
+            queue_delays.append(time.perf_counter() - enqueued)
+            try:
+                handled = await dispatch(main.app, client, kind, update, types)
+                counts["handled" if handled else "unhandled"] += 1
+            except Exception as e:
+                counts["errors"] += 1
+                if counts["errors"] <= 3:
+                    print(f"handler error on {kind} update: {type(e).__name__}: {e}")
+            latencies.append(time.perf_counter() - enqueued)
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(workers)]
+    calls_before = sum(client.calls.values())
+
+    # Open loop: updates arrive on schedule whether or not workers keep up
+    start = time.perf_counter()
+    fed = 0
+    for record in stream:
+        delay = start + record["t"] - time.perf_counter()
+        if delay > 0.001:
+            await asyncio.sleep(delay)
+        kind, update = build_update(client, record)
+        queue.put_nowait((time.perf_counter(), kind, update))
+        fed += 1
+    feed_time = time.perf_counter() - start
+
+    for _ in tasks:
+        queue.put_nowait(None)
+    await asyncio.gather(*tasks)
+    total_time = time.perf_counter() - start
+
+    if not fed:
+        print("no updates to replay")
+        return
+    calls = sum(client.calls.values()) - calls_before
+    print(f"fed {fed} updates in {feed_time:.2f}s ({fed / feed_time:,.0f}/s), "
+          f"drained after {total_time:.2f}s ({fed / total_time:,.0f}/s processed)")
+    print(f"handled {counts['handled']}, no matching handler {counts['unhandled']}, errors {counts['errors']}")
+    print(describe("queueing delay", queue_delays))
+    print(describe("end-to-end", latencies))
+    print(f"API calls/update {calls / fed:.2f}: {dict(client.calls.most_common())}")
+    print(f"membership cache: {main.membership_cache.stats()}")
+    if args.mirror:
+        print(f"membership mirror: {main.membership_mirror.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log", help="JSONL log recorded with RECORD_UPDATES")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor for --log")
+    parser.add_argument("--rate", type=float, default=10000, help="synthetic updates per second")
+    parser.add_argument("--duration", type=float, default=1.0, help="synthetic burst length in seconds")
+    parser.add_argument("--subscribed", type=float, default=0.8, help="share of synthetic users who joined")
+    parser.add_argument("--users", type=int, default=50000, help="distinct synthetic users")
+    parser.add_argument("--files", type=int, default=500, help="distinct stored files linked")
+    parser.add_argument("--mirror", action="store_true", help="answer subscription checks from a filled mirror")
+    parser.add_argument("--workers", type=int, default=0, help="default: same as the bot")
+    parser.add_argument("--latency", type=float, default=0.02, help="stub API latency in seconds")
+    args = parser.parse_args()
+
+    with isolated_bot_state():
+        import main as bot
+        # Handlers were registered on the client's loop; replay on the same one
+        bot.app.loop.run_until_complete(replay(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Offline stand-in for pyrogram.Client used by the benchmarks.
+
+Every API method sleeps for a configurable latency and is counted in
+``client.calls`` so benchmarks can report API calls per operation.
+Latency can be set per method, and ``errors`` makes a method fail at a
+given rate (``{"copy_message": 0.05}``) or with a given exception
+(``{"copy_message": (0.05, FloodWait(value=3))}``). Raw calls made with
+``invoke`` are named after their TL function (``messages.ForwardMessages``).
+"""
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+try:
+    from pyrogram.enums import ChatMemberStatus, ChatType
+    MEMBER, ADMINISTRATOR = ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR
+    PRIVATE, CHANNEL = ChatType.PRIVATE, ChatType.CHANNEL
+except ImportError:
+    MEMBER, ADMINISTRATOR = "member", "administrator"
+    PRIVATE, CHANNEL = "private", "channel"
+
+try:
+    # filters.regex type-checks callback queries
+    from pyrogram.types import CallbackQuery as _CallbackQueryBase
+except ImportError:
+    _CallbackQueryBase = object
+
+BOT_ID = 1000
+BOT_USERNAME = "FileStoreBot"
+
+
+class StubError(Exception):
+    """Injected API failure"""
+
+
+class StubMessage:
+    def __init__(self, client, message_id, chat_id, user_id=None, text=None, **media):
+        self._client = client
+        self.id = message_id
+        self.chat = SimpleNamespace(id=chat_id, type=PRIVATE if chat_id > 0 else CHANNEL)
+        self.from_user = (SimpleNamespace(id=user_id, mention=f"user{user_id}", is_self=False)
+                          if user_id is not None else None)
+        self.text = text
+        self.caption = None
+        self.document = media.get("document")
+        self.video = media.get("video")
+        self.audio = media.get("audio")
+        self.photo = media.get("photo")
+        self.reply_to_message = None
+        self.reply_markup = None
+
+    async def reply(self, text, **kwargs):
+        return await self._client.send_message(self.chat.id, text, **kwargs)
+
+    reply_text = reply
+
+    async def edit_text(self, text, **kwargs):
+        return await self._client.edit_message_text(self.chat.id, self.id, text, **kwargs)
+
+    async def edit_reply_markup(self, reply_markup=None):
+        return await self._client.edit_message_reply_markup(self.chat.id, self.id, reply_markup)
+
+    async def delete(self):
+        return await self._client.delete_messages(self.chat.id, self.id)
+
+    async def react(self, emoji):
+        return await self._client.send_reaction(self.chat.id, self.id, emoji)
+
+
+class StubCallbackQuery(_CallbackQueryBase):
+    def __init__(self, client, user_id, data, message):
+        self._client = client
+        self.id = str(next(client._ids))
+        self.from_user = SimpleNamespace(id=user_id, mention=f"user{user_id}")
+        self.data = data
+        self.message = message
+
+    async def answer(self, text=None, show_alert=None, **kwargs):
+        return await self._client.answer_callback_query(self.id, text, show_alert)
+
+
+class StubInlineQuery:
+    def __init__(self, client, user_id, query, offset=""):
+        self._client = client
+        self.id = str(next(client._ids))
+        self.from_user = SimpleNamespace(id=user_id, mention=f"user{user_id}")
+        self.query = query
+        self.offset = offset
+
+    async def answer(self, results, **kwargs):
+        return await self._client.answer_inline_query(self.id, results, **kwargs)
+
+
+class StubClient:
+    def __init__(self, latency: float = 0.05, members=None, latencies=None, errors=None, seed=None):
+        self.latency = latency
+        self.latencies = latencies or {}
+        self.errors = errors or {}
+        self.members = members
+        self.me = SimpleNamespace(id=BOT_ID, username=BOT_USERNAME, is_bot=True)
+        self.calls = Counter()
+        self.failures = Counter()
+        self._ids = itertools.count(1)
+        self._rng = random.Random(seed)
+
+    async def _api(self, method):
+        self.calls[method] += 1
+        latency = self.latencies.get(method, self.latency)
+        if latency:
+            await asyncio.sleep(latency)
+        error = self.errors.get(method)
+        if error:
+            rate, exception = error if isinstance(error, tuple) else (error, None)
+            if self._rng.random() < rate:
+                self.failures[method] += 1
+                raise exception or StubError(f"injected {method} failure")
+
+    def message(self, chat_id, user_id=None, text=None, **media):
+        return StubMessage(self, next(self._ids), chat_id, user_id, text, **media)
+
+    def bot_message(self, chat_id, text=None, **media):
+        """A message the bot itself sent (what callback queries are attached to)"""
+        message = self.message(chat_id, BOT_ID, text, **media)
+        message.from_user.is_self = True
+        return message
+
+    def callback_query(self, user_id, data, message=None):
+        return StubCallbackQuery(self, user_id, data, message or self.bot_message(user_id))
+
+    def inline_query(self, user_id, query, offset=""):
+        return StubInlineQuery(self, user_id, query, offset)
+
+    def document(self, file_unique_id, file_name="file.bin", file_size=1024 * 1024):
+        return SimpleNamespace(file_id=f"F{file_unique_id}", file_unique_id=file_unique_id,
+                               file_name=file_name, mime_type="application/octet-stream",
+                               file_size=file_size)
+
+    async def get_me(self):
+        await self._api("get_me")
+        return SimpleNamespace(id=BOT_ID, username=BOT_USERNAME, is_bot=True)
+
+    async def get_chat(self, chat_id):
+        await self._api("get_chat")
+        return SimpleNamespace(id=int(chat_id) if str(chat_id).lstrip('-').isdigit() else -100123,
+                               title="Stub channel", username=None)
+
+    async def get_chat_member(self, chat_id, user_id):
+        await self._api("get_chat_member")
+        if user_id == "me":
+            return SimpleNamespace(status=ADMINISTRATOR,
+                                   privileges=SimpleNamespace(can_post_messages=True))
+        is_member = self.members is None or user_id in self.members
+        return SimpleNamespace(status=MEMBER if is_member else "left")
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await self._api("send_message")
+        return self.message(chat_id, text=text)
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        await self._api("send_photo")
+        return self.bot_message(chat_id, photo=SimpleNamespace(file_id=f"P{photo}"))
+
+    async def send_reaction(self, chat_id, message_id, emoji):
+        await self._api("send_reaction")
+        return True
+
+    async def forward_messages(self, chat_id, from_chat_id, message_ids, **kwargs):
+        await self._api("forward_messages")
+        if isinstance(message_ids, int):
+            return self.message(chat_id)
+        return [self.message(chat_id) for _ in message_ids]
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        await self._api("edit_message_text")
+        return self.message(chat_id, text=text)
+
+    async def edit_message_reply_markup(self, chat_id, message_id, reply_markup=None):
+        await self._api("edit_message_reply_markup")
+        return self.message(chat_id)
+
+    async def delete_messages(self, chat_id, message_ids):
+        await self._api("delete_messages")
+        return 1 if isinstance(message_ids, int) else len(message_ids)
+
+    async def answer_callback_query(self, callback_query_id, text=None, show_alert=None, **kwargs):
+        await self._api("answer_callback_query")
+        return True
+
+    async def answer_inline_query(self, inline_query_id, results, **kwargs):
+        await self._api("answer_inline_query")
+        return True
+
+    async def get_users(self, user_ids):
+        await self._api("get_users")
+        if isinstance(user_ids, (list, tuple)):
+            return [SimpleNamespace(id=user_id, first_name=f"user{user_id}", username=None) for user_id in user_ids]
+        return SimpleNamespace(id=user_ids, first_name=f"user{user_ids}", username=None)
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        await self._api("copy_message")
+        return self.message(chat_id)
+
+    # Pyrogram 2.0.106 has no copy_messages: bulk copies go through the raw
+    # messages.ForwardMessages fallback in services.delivery, as in production
+    def rnd_id(self):
+        return self._rng.getrandbits(63)
+
+    async def resolve_peer(self, peer_id):
+        # Answered from Pyrogram's local peer storage, not an API call
+        return SimpleNamespace(peer_id=peer_id)
+
+    async def invoke(self, query, **kwargs):
+        method = type(query).QUALNAME.replace("functions.", "", 1)
+        await self._api(method)
+        return SimpleNamespace(updates=[self.message(query.to_peer.peer_id) for _ in getattr(query, "id", ())])
+
+
+def _flush_bot_state():
+    """Write out everything the bot queued in the background, while still in the temp dir"""
+    from handlers.admin_handler import config_store
+    config_store.flush()
+    file_handler = sys.modules.get("handlers.file_handler")
+    if file_handler is not None:
+        file_handler.file_index.flush()
+    main = sys.modules.get("main")
+    if main is not None:
+        main.user_requests.flush()
+
+
+@contextmanager
+def isolated_bot_state():
+    """Run with the bot's config and SQLite files in a throwaway directory.
+
+    Must be entered before main/handlers are imported: they resolve their
+    ``config/`` paths against the working directory.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            from handlers.admin_handler import ADMIN_CONFIG_FILE, default_admin_config
+            # Welcome photo already uploaded once, as on a running bot
+            config = dict(default_admin_config(), welcome_image_file_id="AgACAgQAAxkBAAIB")
+            with open(ADMIN_CONFIG_FILE, "w", encoding="utf-8") as f:
+                json.dump(config, f)
+            yield tmp
+        finally:
+            # Queued writes resolve their relative paths when they run
+            _flush_bot_state()
+            os.chdir(cwd)
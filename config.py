@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from services.log import setup_logging, add_secret, get_logger, fields
 
 load_dotenv()
 
@@ -10,10 +11,16 @@ API_HASH = os.getenv("API_HASH", " ")
 # Bot Token - Using the new token value
 BOT_TOKEN = os.getenv("BOT_TOKEN", " ")
 
+# Credentials never appear in the logs
+add_secret(API_HASH.strip())
+add_secret(BOT_TOKEN.strip())
+setup_logging()
+logger = get_logger(__name__)
+
 # Validate credentials
 if not all([API_ID, API_HASH, BOT_TOKEN]) or BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
-    print("❌ ERROR: Please set a valid BOT_TOKEN in config.py or as an environment variable")
-    print("Get a new token from @BotFather if your current one is deactivated")
+    logger.error("Please set a valid BOT_TOKEN in config.py or as an environment variable")
+    logger.error("Get a new token from @BotFather if your current one is deactivated")
 
 # Channel IDs - Important: Telegram requires numeric IDs for channel access
 # Using the exact ID from your forwarded message
@@ -21,6 +28,13 @@ STORAGE_CHANNEL = -1002605972463  # Storage channel ID (numeric format)
 POST_CHANNEL = -1002605972463     # Post channel (same as storage)
 DUMP_CHANNEL = -1002605972463     # Using storage channel as dump
 
+# Sends per second (and burst) into the storage channel. It is the bot's own
+# archive that nobody reads live, so it doesn't get the 20/min group budget,
+# which would cap uploads and bulk ingest at 20 files a minute. A FloodWait
+# from Telegram still parks it.
+STORAGE_SEND_RATE = float(os.getenv("STORAGE_SEND_RATE", "1"))
+STORAGE_SEND_BURST = float(os.getenv("STORAGE_SEND_BURST", "20"))
+
 # Force Subscribe Channel
 FORCE_SUB_CHANNEL = "@athithan_220"
 
@@ -48,7 +62,12 @@ FILE_UPLOAD_TEXT = """
 # Debug mode
 DEBUG = True
 
-print("Bot Configuration:")
-print(f"API_ID: {API_ID}")
-print(f"BOT_TOKEN: {BOT_TOKEN}")
-print(f"Channels: Storage={STORAGE_CHANNEL}, Post={POST_CHANNEL}")
+# Append every incoming update to this JSONL file for offline replay
+# (benchmarks/replay.py); empty disables recording
+RECORD_UPDATES = os.getenv("RECORD_UPDATES", "")
+
+# Local Prometheus-style metrics endpoint (set METRICS_PORT=0 to disable)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+logger.info("Bot configuration", extra=fields(api_id=API_ID, storage_channel=STORAGE_CHANNEL, post_channel=POST_CHANNEL))
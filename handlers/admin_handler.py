@@ -1,7 +1,17 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
+import asyncio
 import os
-import json
+import copy
+from services.config_store import ConfigStore
+from services.media_cache import MediaRefCache
+from services.peer_ref import PeerRefCache
+from services.admins import AdminDirectory, ADMIN, OWNER, ROLES
+from services.membership_mirror import is_admin_status
+from services.callback_router import callback_data
+from services.log import get_logger
+
+logger = get_logger(__name__)
 
 # Admin settings file
 ADMIN_CONFIG_FILE = "config/admin_config.json"
@@ -10,18 +20,9 @@ DEFAULT_ADMIN = 7424730333  # Admin ID
 # Ensure config directory exists
 os.makedirs("config", exist_ok=True)
 
-# Load or create admin config
-def load_admin_config():
-    try:
-        if os.path.exists(ADMIN_CONFIG_FILE):
-            with open(ADMIN_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading admin config: {e}")
-    
-    # Default config
-    default_config = {
-        "admins": DEFAULT_ADMIN,
+def default_admin_config():
+    return {
+        "admins": {str(DEFAULT_ADMIN): OWNER},  # user ID -> "owner" or "admin"
         "force_sub_channel": "@athithan_220",
         "storage_channel": -1001986592737,  # Match with config.py (numeric format)
         "welcome_image": "welcome_image.jpg",
@@ -31,46 +32,57 @@ def load_admin_config():
         "maintenance_mode": False,  # Maintenance mode
         "max_file_size": 4096  # Max file size in MB (4GB)
     }
-    
-    # Save default config
-    save_admin_config(default_config)
-    return default_config
+
+# In-memory config snapshot, re-read only when the file changes
+config_store = ConfigStore(ADMIN_CONFIG_FILE, default_admin_config)
+
+# Welcome image is uploaded once; later sends reuse the Telegram file_id
+welcome_media = MediaRefCache(config_store, "welcome_image", "welcome_image_file_id")
+
+# Force-sub channel username resolved to its numeric peer once and stored
+force_sub_peer = PeerRefCache(config_store, "force_sub_channel", "force_sub_peer")
+
+def get_admin_config():
+    """Read-only config snapshot for hot paths"""
+    return config_store.snapshot()
+
+# Mutable copy of the admin config (for callers that modify and save it)
+def load_admin_config():
+    return copy.deepcopy(dict(config_store.snapshot()))
 
 def save_admin_config(config):
+    return config_store.save(config)
+
+# Admin IDs and roles, re-parsed only when the config snapshot changes
+admins = AdminDirectory(config_store, "admins", DEFAULT_ADMIN)
+
+def _user_id(user_id):
     try:
-        with open(ADMIN_CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4)
-        return True
-    except Exception as e:
-        print(f"Error saving admin config: {e}")
-        return False
+        return int(user_id) if user_id else 0
+    except (TypeError, ValueError):
+        return 0
 
 def is_admin(user_id):
-    try:
-        config = load_admin_config()
-        # Force user_id to be an integer
-        user_id = int(user_id) if user_id else 0
-        admin_id = int(config["admins"]) if config.get("admins") else DEFAULT_ADMIN
-        
-        # Debug print
-        print(f"Checking admin: user_id={user_id}, admin_id={admin_id}, result={user_id == admin_id}")
-        
-        return user_id == admin_id
-    except Exception as e:
-        print(f"Error checking admin status: {e}")
-        # Fallback to default admin
-        return int(user_id) == DEFAULT_ADMIN
+    if type(user_id) is not int:
+        user_id = _user_id(user_id)
+    return admins.is_admin(user_id)
+
+def is_owner(user_id):
+    if type(user_id) is not int:
+        user_id = _user_id(user_id)
+    return admins.is_owner(user_id)
 
 # Settings menu for regular users
-async def show_settings(client: Client, message: Message):
+async def show_settings(client: Client, message: Message, user_id=None):
     buttons = [
         [InlineKeyboardButton("📞 Contact Us", callback_data="contact_info")],
         [InlineKeyboardButton("ℹ️ About", callback_data="about")],
         [InlineKeyboardButton("❌ Close", callback_data="close_settings")]
     ]
     
-    # Add admin settings button if user is admin
-    if is_admin(message.from_user.id):
+    # Add admin settings button if user is admin (callback messages are
+    # the bot's own, so callers pass who clicked)
+    if is_admin(user_id if user_id is not None else message.from_user.id):
         buttons.insert(0, [InlineKeyboardButton("⚙️ Admin Settings", callback_data="admin_settings")])
     
     await message.reply(
@@ -80,25 +92,19 @@ async def show_settings(client: Client, message: Message):
     )
 
 # Admin Settings Menu
-async def show_admin_settings(client: Client, message: Message):
+async def show_admin_settings(client: Client, message: Message, user_id=None):
     try:
-        user_id = message.from_user.id if hasattr(message, 'from_user') else 0
+        # On a callback the message is the bot's own, so the caller passes
+        # the user who clicked
+        if user_id is None:
+            user_id = message.from_user.id if message.from_user else 0
         
         # Only allow admin to access this
         if not is_admin(user_id):
-            try:
-                # Try to answer callback query if it exists
-                if hasattr(message, 'callback_query'):
-                    await message.callback_query.answer("❌ Only admin can access!", show_alert=True)
-                    return
-            except:
-                pass
-            
-            # Otherwise send a reply
             await message.reply("❌ Only admin can access!")
             return
             
-        config = load_admin_config()
+        config = get_admin_config()
         bulk_mode_status = "ON ✅" if config.get("bulk_mode", False) else "OFF ❌"
         auto_accept_status = "ON ✅" if config.get("auto_accept", True) else "OFF ❌"
         maintenance_status = "ON 🛠" if config.get("maintenance_mode", False) else "OFF ✅"
@@ -109,12 +115,13 @@ async def show_admin_settings(client: Client, message: Message):
             [InlineKeyboardButton("⚙️ Bot Settings", callback_data="bot_settings")],
             [InlineKeyboardButton("👥 Admin Management", callback_data="admin_management")],
             [InlineKeyboardButton(f"📦 Bulk Mode: {bulk_mode_status}", callback_data="toggle_bulk")],
+            [InlineKeyboardButton("📊 Stats", callback_data="show_stats")],
             [InlineKeyboardButton("🔙 Back", callback_data="back_to_settings")],
             [InlineKeyboardButton("❌ Close", callback_data="close_settings")]
         ]
         
-        # If this message is a callback query result, edit the message
-        if hasattr(message, 'edit_text'):
+        # Edit the menu in place when it is the bot's own message
+        if message.from_user and message.from_user.is_self:
             await message.edit_text(
                 "⚙️ **Admin Settings Panel**\n\n"
                 "**Current Settings:**\n"
@@ -137,61 +144,73 @@ async def show_admin_settings(client: Client, message: Message):
                 reply_markup=InlineKeyboardMarkup(buttons)
             )
     except Exception as e:
-        print(f"Error in show_admin_settings: {e}")
+        logger.exception("Error in show_admin_settings")
         if isinstance(message, Message):
             await message.reply("❌ Error showing admin settings")
         else:
             await message.edit_text("❌ Error showing admin settings")
 
-async def show_admin_management(client: Client, message: Message):
+# Admins listed per page of the admin management menu
+ADMINS_PER_PAGE = 10
+
+async def show_admin_management(client: Client, message: Message, user_id=None, page: int = 0):
     try:
-        user_id = message.from_user.id if hasattr(message, 'from_user') else 0
+        # On a callback the message is the bot's own, so the caller passes
+        # the user who clicked
+        if user_id is None:
+            user_id = message.from_user.id if message.from_user else 0
         
         # Only allow admin to access this
         if not is_admin(user_id):
-            try:
-                # Try to answer callback query if it exists
-                if hasattr(message, 'callback_query'):
-                    await message.callback_query.answer("❌ Only admin can access!", show_alert=True)
-                    return
-            except:
-                pass
-            
-            # Otherwise send a reply
             await message.reply("❌ Only admin can access!")
             return
                 
-        config = load_admin_config()
-        current_admin = config["admins"]
+        roles = admins.roles
+        listed = sorted(roles.items(), key=lambda item: (item[1] != OWNER, item[0]))
+        pages = max(1, -(-len(listed) // ADMINS_PER_PAGE))
+        page = min(max(page, 0), pages - 1)
+        listed = listed[page * ADMINS_PER_PAGE:(page + 1) * ADMINS_PER_PAGE]
         
         buttons = [
-            [InlineKeyboardButton("➕ Set New Admin", callback_data="set_admin")],
+            [InlineKeyboardButton("➕ Add Admin", callback_data="set_admin")],
             [InlineKeyboardButton("🔙 Back", callback_data="admin_settings")],
             [InlineKeyboardButton("❌ Close", callback_data="close_settings")]
         ]
+        if pages > 1:
+            nav = []
+            if page > 0:
+                nav.append(InlineKeyboardButton("⬅️ Prev", callback_data=callback_data("admin_management", page - 1)))
+            if page < pages - 1:
+                nav.append(InlineKeyboardButton("Next ➡️", callback_data=callback_data("admin_management", page + 1)))
+            buttons.insert(0, nav)
         
         admin_info = "👥 **Admin Management**\n\n"
-        admin_info += "**Current Admin:**\n"
+        admin_info += f"**Admins ({len(roles)}):**"
+        admin_info += f" page {page + 1}/{pages}\n" if pages > 1 else "\n"
         try:
-            admin_user = await client.get_users(current_admin)
-            admin_info += f"• ID: `{admin_user.id}`\n"
-            admin_info += f"• Name: {admin_user.first_name}\n"
-            if admin_user.username:
-                admin_info += f"• Username: @{admin_user.username}\n"
-        except:
-            admin_info += f"• ID: `{current_admin}`\n"
+            # Only this page's admins are looked up
+            users = {user.id: user for user in await client.get_users([admin_id for admin_id, _ in listed])}
+        except Exception:
+            users = {}
+        for admin_id, role in listed:
+            user = users.get(admin_id)
+            name = f"{user.first_name}" + (f" (@{user.username})" if user.username else "") if user else ""
+            admin_info += f"• `{admin_id}` {name} — {role}\n"
         
-        admin_info += "\nClick 'Set New Admin' to change the admin."
+        admin_info += (
+            "\nOwners can add admins with 'Add Admin' or\n"
+            "`/addadmin <user_id> [admin|owner]` and remove them with `/deladmin <user_id>`."
+        )
         
-        # Check if message has edit_text method
-        if hasattr(message, 'edit_text'):
+        # Edit the menu in place when it is the bot's own message
+        if message.from_user and message.from_user.is_self:
             await message.edit_text(admin_info, reply_markup=InlineKeyboardMarkup(buttons))
         else:
             # Send a new message
             await message.reply(admin_info, reply_markup=InlineKeyboardMarkup(buttons))
             
     except Exception as e:
-        print(f"Error in show_admin_management: {str(e)}")
+        logger.exception("Error in show_admin_management")
         if hasattr(message, 'edit_text'):
             await message.edit_text(f"❌ Error showing admin management: {str(e)}")
         else:
@@ -199,33 +218,29 @@ async def show_admin_management(client: Client, message: Message):
 
 async def handle_set_admin(client: Client, message: Message):
     try:
-        if not is_admin(message.from_user.id):
-            await message.reply("❌ Only current admin can set new admin!")
+        if not is_owner(message.from_user.id):
+            await message.reply("❌ Only owners can add admins!")
             return
             
-        if not message.reply_to_message:
+        reply = message.reply_to_message
+        if not reply:
             await message.reply(
                 "❌ Please reply to the user's message to make them admin!\n\n"
-                "Note: The current admin will be replaced with the new admin."
+                "Note: Existing admins keep their access."
             )
             return
             
-        new_admin_id = message.reply_to_message.from_user.id
-        new_admin_name = message.reply_to_message.from_user.first_name
-        
-        config = load_admin_config()
-        if new_admin_id == config["admins"]:
-            await message.reply("⚠️ This user is already the admin!")
+        # A forwarded message stands for its original sender
+        new_admin = reply.forward_from or reply.from_user
+        if admins.is_admin(new_admin.id):
+            await message.reply("⚠️ This user is already an admin!")
             return
             
-        # Update admin
-        config["admins"] = new_admin_id
-        if save_admin_config(config):
+        if admins.add(new_admin.id, ADMIN):
             await message.reply(
-                f"✅ New admin set successfully!\n\n"
-                f"New Admin: {new_admin_name}\n"
-                f"ID: `{new_admin_id}`\n\n"
-                "⚠️ Note: The bot will now only respond to the new admin's commands.",
+                f"✅ New admin added successfully!\n\n"
+                f"New Admin: {new_admin.first_name}\n"
+                f"ID: `{new_admin.id}`",
                 reply_markup=InlineKeyboardMarkup([[
                     InlineKeyboardButton("🔙 Back to Settings", callback_data="admin_management")
                 ]])
@@ -234,12 +249,92 @@ async def handle_set_admin(client: Client, message: Message):
             await message.reply("❌ Failed to save configuration!")
             
     except Exception as e:
-        print(f"Error in handle_set_admin: {str(e)}")
+        logger.exception("Error in handle_set_admin")
+        await message.reply(f"❌ Error: {str(e)}")
+
+def _command_target(message: Message):
+    """(user_id, role) from "/cmd <user_id> [role]" or a replied-to message"""
+    parts = (message.text or "").split()
+    role = ADMIN
+    if len(parts) > 1 and parts[1].lstrip("-").isdigit():
+        user_id = int(parts[1])
+        if len(parts) > 2:
+            role = parts[2].lower()
+    elif message.reply_to_message:
+        reply = message.reply_to_message
+        user = reply.forward_from or reply.from_user
+        user_id = user.id if user else None
+        if len(parts) > 1:
+            role = parts[1].lower()
+    else:
+        user_id = None
+    return user_id, role
+
+async def handle_add_admin(client: Client, message: Message):
+    try:
+        if not is_owner(message.from_user.id):
+            await message.reply("❌ Only owners can add admins!")
+            return
+            
+        user_id, role = _command_target(message)
+        if user_id is None or role not in ROLES:
+            await message.reply(
+                "Usage: `/addadmin <user_id> [admin|owner]`\n"
+                "or reply to a user's (forwarded) message with `/addadmin`."
+            )
+            return
+            
+        if admins.role(user_id) == role:
+            await message.reply(f"⚠️ `{user_id}` is already {role}!")
+            return
+            
+        try:
+            added = admins.add(user_id, role)
+        except ValueError:
+            await message.reply("❌ Cannot demote the last owner!")
+            return
+        if added:
+            await message.reply(f"✅ `{user_id}` is now {role}.")
+        else:
+            await message.reply("❌ Failed to save configuration!")
+    except Exception as e:
+        logger.exception("Error in handle_add_admin")
+        await message.reply(f"❌ Error: {str(e)}")
+
+async def handle_del_admin(client: Client, message: Message):
+    try:
+        if not is_owner(message.from_user.id):
+            await message.reply("❌ Only owners can remove admins!")
+            return
+            
+        user_id, _ = _command_target(message)
+        if user_id is None:
+            await message.reply(
+                "Usage: `/deladmin <user_id>`\n"
+                "or reply to a user's (forwarded) message with `/deladmin`."
+            )
+            return
+            
+        if not admins.is_admin(user_id):
+            await message.reply(f"⚠️ `{user_id}` is not an admin!")
+            return
+            
+        try:
+            removed = admins.remove(user_id)
+        except ValueError:
+            await message.reply("❌ Cannot remove the last owner!")
+            return
+        if removed:
+            await message.reply(f"✅ `{user_id}` is no longer an admin.")
+        else:
+            await message.reply("❌ Failed to save configuration!")
+    except Exception as e:
+        logger.exception("Error in handle_del_admin")
         await message.reply(f"❌ Error: {str(e)}")
 
 # Show specific settings menus
 async def show_file_settings(client: Client, message: Message):
-    config = load_admin_config()
+    config = get_admin_config()
     buttons = [
         [InlineKeyboardButton("📸 Set Welcome Image", callback_data="set_image")],
         [InlineKeyboardButton("✏️ Set Welcome Caption", callback_data="set_caption")],
@@ -252,15 +347,16 @@ async def show_file_settings(client: Client, message: Message):
     settings_text = "📂 **File Settings**\n\n"
     settings_text += f"**Current Settings:**\n"
     settings_text += f"• Max File Size: {config.get('max_file_size', 4096)}MB\n"
-    settings_text += f"• Welcome Image: {'✅ Set' if os.path.exists(config['welcome_image']) else '❌ Not Set'}\n"
+    settings_text += f"• Welcome Image: {'✅ Set' if welcome_media.exists() else '❌ Not Set'}\n"
     settings_text += f"\n**Current Caption:**\n{config['welcome_caption']}\n\n"
     settings_text += "Choose an option to modify:"
     
     # If welcome image exists, send it with settings
-    if os.path.exists(config['welcome_image']):
+    if welcome_media.exists():
         try:
-            await message.reply_photo(
-                photo=config['welcome_image'],
+            await welcome_media.send_photo(
+                client,
+                message.chat.id,
                 caption=settings_text,
                 reply_markup=InlineKeyboardMarkup(buttons)
             )
@@ -270,13 +366,13 @@ async def show_file_settings(client: Client, message: Message):
             except:
                 pass
         except Exception as e:
-            print(f"Error sending welcome image: {e}")
+            logger.warning("Error sending welcome image: %s", e)
             await message.edit_text(settings_text, reply_markup=InlineKeyboardMarkup(buttons))
     else:
         await message.edit_text(settings_text, reply_markup=InlineKeyboardMarkup(buttons))
 
 async def show_channel_settings(client: Client, message: Message):
-    config = load_admin_config()
+    config = get_admin_config()
     buttons = [
         [InlineKeyboardButton("📦 Set Storage Channel", callback_data="set_storage")],
         [InlineKeyboardButton("🔔 Set Force Sub Channel", callback_data="set_force_sub")],
@@ -298,7 +394,7 @@ async def show_channel_settings(client: Client, message: Message):
     )
 
 async def show_bot_settings(client: Client, message: Message):
-    config = load_admin_config()
+    config = get_admin_config()
     auto_accept = "ON ✅" if config.get("auto_accept", True) else "OFF ❌"
     maintenance = "ON 🛠" if config.get("maintenance_mode", False) else "OFF ✅"
     
@@ -317,6 +413,29 @@ async def show_bot_settings(client: Client, message: Message):
         reply_markup=InlineKeyboardMarkup(buttons)
     )
 
+async def show_stats(client: Client, message: Message):
+    from handlers.file_handler import file_index
+
+    # COUNT(*) scans the table, so it runs off the event loop
+    stored = await asyncio.to_thread(file_index.count)
+    dedup = file_index.dedup_stats()
+    lookups = dedup["hits"] + dedup["misses"]
+    text = (
+        "📊 **Bot Stats**\n\n"
+        f"• Stored Files: {stored}\n"
+        f"• Unique Files: {dedup['unique_files']}\n"
+        f"• Duplicate Uploads: {dedup['hits']}/{lookups} ({dedup['hit_rate']:.1%})"
+    )
+    buttons = [
+        [InlineKeyboardButton("🔙 Back", callback_data="admin_settings")],
+        [InlineKeyboardButton("❌ Close", callback_data="close_settings")]
+    ]
+
+    if hasattr(message, 'edit_text') and message.from_user and message.from_user.is_self:
+        await message.edit_text(text, reply_markup=InlineKeyboardMarkup(buttons))
+    else:
+        await message.reply(text, reply_markup=InlineKeyboardMarkup(buttons))
+
 # Settings handlers
 async def handle_set_image(client: Client, message: Message):
     try:
@@ -358,7 +477,7 @@ async def handle_set_image(client: Client, message: Message):
                 await message.reply("❌ Failed to download image. Please try again.")
                 return
         except Exception as e:
-            print(f"Download error: {str(e)}")
+            logger.error("Download error: %s", e)
             await message.reply(f"❌ Download error: {str(e)}")
             return
             
@@ -366,27 +485,31 @@ async def handle_set_image(client: Client, message: Message):
         config = load_admin_config()
         old_image = config["welcome_image"]
         config["welcome_image"] = path
+        # The admin's photo already has a reusable file_id - no re-upload needed
+        config["welcome_image_file_id"] = file_id
         
         if save_admin_config(config):
+            welcome_media.invalidate()
+            
             # Delete old image if different
             if old_image != path and os.path.exists(old_image) and old_image != "welcome_image.jpg":
                 try:
                     os.remove(old_image)
                 except Exception as e:
-                    print(f"Error removing old image: {e}")
+                    logger.warning("Error removing old image: %s", e)
             
             # Show success message with the new image
             try:
-                with open(path, "rb") as photo_file:
-                    await message.reply_photo(
-                        photo=photo_file,
-                        caption="✅ Welcome image updated successfully!\n\nThis is how it will look when users start the bot.",
-                        reply_markup=InlineKeyboardMarkup([[
-                            InlineKeyboardButton("🔙 Back to Settings", callback_data="file_settings")
-                        ]])
-                    )
+                await welcome_media.send_photo(
+                    client,
+                    message.chat.id,
+                    caption="✅ Welcome image updated successfully!\n\nThis is how it will look when users start the bot.",
+                    reply_markup=InlineKeyboardMarkup([[
+                        InlineKeyboardButton("🔙 Back to Settings", callback_data="file_settings")
+                    ]])
+                )
             except Exception as e:
-                print(f"Reply error: {str(e)}")
+                logger.warning("Reply error: %s", e)
                 await message.reply(
                     "✅ Welcome image updated successfully!\n\n"
                     "⚠️ Note: Preview couldn't be sent, but the image has been saved.",
@@ -398,7 +521,7 @@ async def handle_set_image(client: Client, message: Message):
             await message.reply("❌ Failed to save configuration!")
             
     except Exception as e:
-        print(f"Error in handle_set_image: {str(e)}")
+        logger.exception("Error in handle_set_image")
         await message.reply(f"❌ Error: {str(e)}")
 
 async def handle_set_caption(client: Client, message: Message):
@@ -429,9 +552,10 @@ async def handle_set_caption(client: Client, message: Message):
             preview_text += f"{new_caption}"
             
             # If we have a welcome image, show it with the new caption
-            if os.path.exists(config["welcome_image"]):
-                await message.reply_photo(
-                    photo=config["welcome_image"],
+            if welcome_media.exists():
+                await welcome_media.send_photo(
+                    client,
+                    message.chat.id,
                     caption=preview_text,
                     reply_markup=InlineKeyboardMarkup([[
                         InlineKeyboardButton("🔙 Back to Settings", callback_data="file_settings")
@@ -448,7 +572,7 @@ async def handle_set_caption(client: Client, message: Message):
             await message.reply("❌ Failed to save configuration!")
             
     except Exception as e:
-        print(f"Error in handle_set_caption: {str(e)}")
+        logger.exception("Error in handle_set_caption")
         await message.reply(f"❌ Error: {str(e)}")
 
 async def handle_set_storage(client: Client, message: Message):
@@ -618,7 +742,7 @@ async def handle_set_storage(client: Client, message: Message):
                             f.write(new_content)
                             
                 except Exception as e:
-                    print(f"Warning: Couldn't update config.py: {e}")
+                    logger.warning("Couldn't update config.py: %s", e)
                 
                 await message.reply(
                     f"✅ Storage channel updated successfully!\n\n"
@@ -644,7 +768,7 @@ async def handle_set_storage(client: Client, message: Message):
             return
             
     except Exception as e:
-        print(f"Error in handle_set_storage: {str(e)}")
+        logger.exception("Error in handle_set_storage")
         await message.reply(f"❌ Error: {str(e)}")
 
 async def handle_set_force_sub(client: Client, message: Message):
@@ -684,6 +808,17 @@ async def handle_set_force_sub(client: Client, message: Message):
         # Always save ID as string to prevent issues
         config["force_sub_channel"] = f"@{chat.username}" if chat.username else str(chat.id)
         if save_admin_config(config):
+            # get_chat just resolved the channel, so this is answered locally
+            try:
+                await force_sub_peer.resolve(client, force=True)
+            except Exception as e:
+                logger.warning("Could not resolve force sub channel: %s", e)
+            # Memberships seen so far belong to the old channel
+            from handlers.auth import membership_cache, membership_mirror
+            membership_cache.clear()
+            membership_mirror.deactivate()
+            if is_admin_status(bot_member.status):
+                membership_mirror.activate(chat.id)
             await message.reply(
                 f"✅ Force subscribe channel updated successfully!\n\n"
                 f"Channel: {chat.title}\n"
@@ -694,7 +829,7 @@ async def handle_set_force_sub(client: Client, message: Message):
             await message.reply("❌ Failed to save configuration!")
             
     except Exception as e:
-        print(f"Error in handle_set_force_sub: {str(e)}")
+        logger.exception("Error in handle_set_force_sub")
         await message.reply(f"❌ Error: {str(e)}")
 
 async def handle_set_file_size(client: Client, message: Message):
@@ -727,17 +862,12 @@ async def handle_set_file_size(client: Client, message: Message):
             await message.reply("❌ Failed to save configuration!")
             
     except Exception as e:
-        print(f"Error in handle_set_file_size: {str(e)}")
+        logger.exception("Error in handle_set_file_size")
         await message.reply(f"❌ Error: {str(e)}")
 
 # Toggle functions
 async def toggle_bulk_mode(client: Client, callback_query):
     try:
-        user_id = callback_query.from_user.id
-        if not is_admin(user_id):
-            await callback_query.answer("❌ Only admin can access!", show_alert=True)
-            return False
-            
         config = load_admin_config()
         config["bulk_mode"] = not config.get("bulk_mode", False)
         
@@ -761,17 +891,12 @@ async def toggle_bulk_mode(client: Client, callback_query):
             await callback_query.answer("❌ Failed to save config", show_alert=True)
             return False
     except Exception as e:
-        print(f"Error in toggle_bulk_mode: {e}")
+        logger.exception("Error in toggle_bulk_mode")
         await callback_query.answer(f"❌ Error: {str(e)}", show_alert=True)
         return False
 
 async def toggle_auto_accept(client: Client, callback_query):
     try:
-        user_id = callback_query.from_user.id
-        if not is_admin(user_id):
-            await callback_query.answer("❌ Only admin can access!", show_alert=True)
-            return
-            
         config = load_admin_config()
         config["auto_accept"] = not config.get("auto_accept", True)
         save_admin_config(config)
@@ -780,16 +905,11 @@ async def toggle_auto_accept(client: Client, callback_query):
         await show_bot_settings(client, callback_query.message)
         await callback_query.answer(f"Auto accept {'enabled' if config['auto_accept'] else 'disabled'}")
     except Exception as e:
-        print(f"Error in toggle_auto_accept: {e}")
+        logger.exception("Error in toggle_auto_accept")
         await callback_query.answer(f"❌ Error: {str(e)}", show_alert=True)
 
 async def toggle_maintenance(client: Client, callback_query):
     try:
-        user_id = callback_query.from_user.id
-        if not is_admin(user_id):
-            await callback_query.answer("❌ Only admin can access!", show_alert=True)
-            return
-            
         config = load_admin_config()
         config["maintenance_mode"] = not config.get("maintenance_mode", False)
         save_admin_config(config)
@@ -798,7 +918,7 @@ async def toggle_maintenance(client: Client, callback_query):
         await show_bot_settings(client, callback_query.message)
         await callback_query.answer(f"Maintenance mode {'enabled' if config['maintenance_mode'] else 'disabled'}")
     except Exception as e:
-        print(f"Error in toggle_maintenance: {e}")
+        logger.exception("Error in toggle_maintenance")
         await callback_query.answer(f"❌ Error: {str(e)}", show_alert=True)
 
 # Contact Us handler
@@ -823,94 +943,12 @@ def get_random_reaction():
 
 # Get bulk mode status
 def is_bulk_mode_enabled():
-    config = load_admin_config()
-    return config.get("bulk_mode", False)
+    return config_store.get_bool("bulk_mode", False)
 
 # Get maintenance mode status
 def is_maintenance_mode():
-    config = load_admin_config()
-    return config.get("maintenance_mode", False)
+    return config_store.get_bool("maintenance_mode", False)
 
 # Get auto accept status
 def is_auto_accept_enabled():
-    config = load_admin_config()
-    return config.get("auto_accept", True)
-
-# Completely rewritten callback handler
-@Client.on_callback_query()
-async def callback_handler(client, callback_query):
-    try:
-        data = callback_query.data
-        user_id = callback_query.from_user.id
-        
-        # Handle common callbacks first
-        if data == "back_to_settings":
-            if is_admin(user_id):
-                await show_settings(client, callback_query.message)
-            else:
-                await callback_query.answer("❌ Only admin can access!", show_alert=True)
-            await callback_query.answer()
-            return
-            
-        elif data == "close_settings":
-            await callback_query.message.delete()
-            await callback_query.answer()
-            return
-            
-        elif data == "contact_info":
-            await show_contact_info(client, callback_query.message)
-            await callback_query.answer()
-            return
-            
-        # Handle admin-only callbacks
-        elif data in ["admin_settings", "file_settings", "channel_settings", "bot_settings", 
-                     "toggle_bulk", "toggle_auto", "toggle_maintenance", "admin_management"]:
-            if is_admin(user_id):
-                if data == "admin_settings":
-                    await show_admin_settings(client, callback_query.message)
-                elif data == "file_settings":
-                    await show_file_settings(client, callback_query.message)
-                elif data == "channel_settings":
-                    await show_channel_settings(client, callback_query.message)
-                elif data == "bot_settings":
-                    await show_bot_settings(client, callback_query.message)
-                elif data == "toggle_bulk":
-                    await toggle_bulk_mode(client, callback_query)
-                elif data == "toggle_auto":
-                    await toggle_auto_accept(client, callback_query)
-                elif data == "toggle_maintenance":
-                    await toggle_maintenance(client, callback_query)
-                elif data == "admin_management":
-                    await show_admin_management(client, callback_query.message)
-                await callback_query.answer()
-            else:
-                await callback_query.answer("❌ Only admin can access!", show_alert=True)
-            return
-            
-        # Handle other settings-related callbacks
-        elif data in ["set_image", "set_caption", "set_storage", "set_force_sub", "set_file_size", "set_admin"]:
-            if is_admin(user_id):
-                if data == "set_admin":
-                    await callback_query.message.reply(
-                        "👥 **Add New Admin**\n\n"
-                        "Reply to a message from the user you want to make admin.\n\n"
-                        "⚠️ **Warning**: The current admin will be replaced!"
-                    )
-                    await callback_query.answer()
-                else:
-                    instructions = {
-                        "set_image": "📸 Please send the new welcome image (send as photo)",
-                        "set_caption": "✏️ Please send the new welcome caption text",
-                        "set_storage": "📦 Please send the storage channel ID",
-                        "set_force_sub": "🔔 Please send the force subscribe channel username (with @) or ID",
-                        "set_file_size": "📊 Please send the maximum file size in MB (1-2048)"
-                    }
-                    await callback_query.message.reply(instructions[data])
-                    await callback_query.answer()
-            else:
-                await callback_query.answer("❌ Only admin can access!", show_alert=True)
-            return
-            
-    except Exception as e:
-        print(f"Error in callback handler: {e}")
-        await callback_query.answer("❌ Error processing request", show_alert=True) 
\ No newline at end of file
+    return config_store.get_bool("auto_accept", True)
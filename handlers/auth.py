@@ -1,8 +1,12 @@
 from pyrogram import Client
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from pyrogram.enums import ChatMemberStatus
+from services.membership_cache import MembershipCache
+from services.membership_mirror import MembershipMirror
+from services.log import get_logger
 import time
 
+logger = get_logger(__name__)
+
 # Load FORCE_SUB_CHANNEL from config or admin_handler
 try:
     # Try to import from config first
@@ -10,30 +14,22 @@ try:
 except ImportError:
     # If not in config, import from admin_handler
     try:
-        from handlers.admin_handler import load_admin_config
-        config = load_admin_config()
+        from handlers.admin_handler import get_admin_config
+        config = get_admin_config()
         FORCE_SUB_CHANNEL = config["force_sub_channel"]
     except Exception as e:
-        print(f"Error loading FORCE_SUB_CHANNEL: {e}")
+        logger.error("Error loading FORCE_SUB_CHANNEL: %s", e)
         FORCE_SUB_CHANNEL = "@athithan_220"  # Default fallback
 
-async def check_subscription(client, user_id):
-    try:
-        print(f"Checking subscription for user {user_id} in channel {FORCE_SUB_CHANNEL}")
-        member = await client.get_chat_member(FORCE_SUB_CHANNEL, user_id)
-        print(f"Member status: {member.status}")
-        
-        # Check if user is a member
-        allowed_statuses = [
-            ChatMemberStatus.OWNER,
-            ChatMemberStatus.ADMINISTRATOR,
-            ChatMemberStatus.MEMBER
-        ]
-        
-        return member.status in allowed_statuses
-    except Exception as e:
-        print(f"Subscription check error: {e}")
-        return False
+# Shared by every subscription check so repeated /start and "Try Again"
+# clicks don't each cost a get_chat_member call
+membership_cache = MembershipCache()
+
+# Members of the force-sub channel as pushed by chat member updates
+membership_mirror = MembershipMirror("config/membership_mirror.json")
+
+# Subscription checks themselves live in main.check_subscription, which
+# consults the mirror and the resolved force_sub_peer before this cache
 
 def get_subscribe_markup():
     # Get channel username without @ if it starts with @
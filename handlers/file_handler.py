@@ -1,119 +1,197 @@
 from pyrogram.types import Message
 from pyrogram.errors import ChannelInvalid, PeerIdInvalid, ChatAdminRequired, RPCError
-from config import STORAGE_CHANNEL, POST_CHANNEL, DEBUG, FILE_UPLOAD_TEXT
-from services.link_generator import encode_file_id
+from config import STORAGE_CHANNEL, POST_CHANNEL, FILE_UPLOAD_TEXT
+from services.link_generator import generate_share_link, generate_batch_link
+from services.bot_identity import bot_identity
+from services.bulk_ingest import BulkIngest
+from services.file_index import FileIndex, describe_media
+from services.storage_target import StorageTarget, REFRESH_ERRORS
+from services.log import get_logger, fields
 
-async def handle_file(client, message: Message, bulk_mode=False):
+logger = get_logger(__name__)
+
+# Verified at startup by verify_channels() and reused for every upload
+storage_target = StorageTarget(STORAGE_CHANNEL)
+
+# Local record of every stored file, written in batches off the event loop
+file_index = FileIndex("config/files.db")
+
+async def get_storage_channel(client):
+    # Storage channel is resolved and permission-checked once, then pinned
+    storage_channel_id = storage_target.channel_id
+    try:
+        return await storage_target.get(client)
+    except PeerIdInvalid as e:
+        logger.error("Invalid channel ID: %s", storage_channel_id)
+        raise Exception(f"Storage channel ID is invalid. Use the /setchannel command to set a valid channel ID where the bot is an admin. Error: {str(e)}")
+    except ChannelInvalid as e:
+        logger.error("Channel not found: %s", storage_channel_id)
+        raise Exception(f"Storage channel not found. Make sure the bot is a member of the channel. Error: {str(e)}")
+    except ChatAdminRequired as e:
+        logger.error("Bot is not admin in channel: %s", storage_channel_id)
+        raise Exception(f"Bot needs to be an admin in the storage channel with 'Post Messages' permission. Error: {str(e)}")
+    except Exception as e:
+        logger.error("Channel verification failed: %s", e)
+        raise Exception(f"Bot needs admin access to channel. Error: {str(e)}")
+
+async def forward_to_storage(client, from_chat_id, message_ids):
+    storage_channel_id = await get_storage_channel(client)
     try:
-        # Verify channel access first
-        try:
-            # Channel must be numeric - ensure it's treated as an integer
-            storage_channel_id = int(STORAGE_CHANNEL)
-            
-            # Log the channel ID for debugging
-            print(f"Attempting to access storage channel with ID: {storage_channel_id}")
-            
-            # Try to get chat info
-            chat = None
-            try:
-                chat = await client.get_chat(storage_channel_id)
-                print(f"✅ Storage channel access OK: {chat.title} (ID: {chat.id})")
-            except (PeerIdInvalid, ChannelInvalid) as e:
-                # Try alternative channel ID formats if the original doesn't work
-                alternative_ids = [
-                    int(str(storage_channel_id).replace('-100', '-1001')),  # Try -1001 format
-                    int(f"-100{str(abs(storage_channel_id))[3:]}"),  # Different -100 format
-                    int(str(abs(storage_channel_id))[3:])  # Just the numeric part
-                ]
-                
-                for alt_id in alternative_ids:
-                    try:
-                        print(f"Trying alternative channel ID: {alt_id}")
-                        chat = await client.get_chat(alt_id)
-                        if chat:
-                            print(f"✅ Found channel with alternative ID: {chat.title} (ID: {chat.id})")
-                            storage_channel_id = alt_id
-                            break
-                    except Exception:
-                        continue
-                        
-                if not chat:
-                    raise PeerIdInvalid(f"Storage channel not found with any ID format. Original error: {str(e)}")
-            
-            # Check bot permissions
-            bot_member = await client.get_chat_member(chat.id, "me")
-            print(f"Bot permissions in storage channel: {bot_member.status}")
-            
-            # Verify posting permission - improved check that works with different Pyrogram versions
-            can_post = False
-            if hasattr(bot_member, 'privileges'):
-                # New Pyrogram version
-                can_post = getattr(bot_member.privileges, 'can_post_messages', False)
-            else:
-                # Old Pyrogram version
-                can_post = getattr(bot_member, 'can_post_messages', False)
-                
-            if not can_post:
-                print("Bot does not have permission to post messages in the storage channel!")
-                raise ChatAdminRequired("Bot needs to be an admin in the storage channel with 'Post Messages' permission. Please check your channel settings.")
-                
-        except PeerIdInvalid as e:
-            print(f"Invalid channel ID: {storage_channel_id}")
-            raise Exception(f"Storage channel ID is invalid. Use the /setchannel command to set a valid channel ID where the bot is an admin. Error: {str(e)}")
-        except ChannelInvalid as e:
-            print(f"Channel not found: {storage_channel_id}")
-            raise Exception(f"Storage channel not found. Make sure the bot is a member of the channel. Error: {str(e)}")
-        except ChatAdminRequired as e:
-            print(f"Bot is not admin in channel: {storage_channel_id}")
-            raise Exception(f"Bot needs to be an admin in the storage channel with 'Post Messages' permission. Error: {str(e)}")
-        except Exception as e:
-            print(f"Channel verification failed: {str(e)}")
-            raise Exception(f"Bot needs admin access to channel. Error: {str(e)}")
-
-        if DEBUG:
-            print(f"Processing file from user {message.from_user.id}")
-        
-        # Forward to storage channel
         try:
-            stored_msg = await client.forward_messages(
+            stored = await client.forward_messages(
+                chat_id=storage_channel_id,
+                from_chat_id=from_chat_id,
+                message_ids=message_ids
+            )
+        except REFRESH_ERRORS as e:
+            # Pinned peer/permissions went stale - re-verify once and retry
+            logger.warning("Storage channel rejected forward (%s), re-resolving", e)
+            storage_target.invalidate()
+            storage_channel_id = await get_storage_channel(client)
+            stored = await client.forward_messages(
                 chat_id=storage_channel_id,
-                from_chat_id=message.chat.id,
-                message_ids=message.id
+                from_chat_id=from_chat_id,
+                message_ids=message_ids
             )
-            
-            if not stored_msg:
-                raise Exception("Failed to forward message to storage channel")
-                
-            print(f"Message successfully forwarded to storage channel, ID: {stored_msg.id}")
-        except Exception as e:
-            print(f"Failed to forward message: {str(e)}")
-            raise Exception(f"Failed to forward message to storage channel: {str(e)}")
-
-        # Generate encoded file ID
-        encoded_id = encode_file_id(stored_msg.id)
-        
-        # Create share link
-        bot_info = await client.get_me()
-        share_link = f"https://t.me/{bot_info.username}?start={encoded_id}"
-        
+
+        if not stored:
+            raise Exception("Failed to forward message to storage channel")
+        return stored
+    except Exception as e:
+        logger.error("Failed to forward message: %s", e)
+        raise Exception(f"Failed to forward message to storage channel: {str(e)}")
+
+def _file_size(message):
+    media = message.document or message.video or message.audio
+    return getattr(media, 'file_size', 0) or 0
+
+def _match_stored(originals, stored):
+    """Storage copy of each original (None if it didn't come back)
+
+    forward_messages skips messages it couldn't forward, so a short result
+    is matched by file_unique_id instead of position.
+    """
+    if len(stored) == len(originals):
+        return list(stored)
+    copies = {}
+    for stored_msg in stored:
+        unique_id = describe_media(stored_msg)[0]
+        if unique_id:
+            copies.setdefault(unique_id, stored_msg)
+    return [copies.get(describe_media(m)[0]) for m in originals]
+
+async def store_bulk_batch(client, messages):
+    # One forward call and one reply for a whole bulk-mode batch
+    first = messages[0]
+    try:
+        # Files already in storage (or sent twice in this batch) are linked, not forwarded again
+        existing = {}
+        first_of = {}
+        new_messages = []
+        for m in messages:
+            unique_id = describe_media(m)[0]
+            if unique_id in first_of:
+                continue
+            existing[m.id] = await file_index.afind_duplicate(unique_id)
+            if unique_id:
+                first_of[unique_id] = m.id
+            if existing[m.id] is None:
+                new_messages.append(m)
+
+        for start in range(0, len(new_messages), bulk_ingest.max_batch):
+            chunk = new_messages[start:start + bulk_ingest.max_batch]
+            stored = await forward_to_storage(client, first.chat.id, [m.id for m in chunk])
+            for original, stored_msg in zip(chunk, _match_stored(chunk, stored)):
+                if stored_msg is not None:
+                    file_index.record(stored_msg.id, original.from_user.id, original)
+                    existing[original.id] = stored_msg.id
+        for m in messages:
+            unique_id = describe_media(m)[0]
+            if m.id not in existing:
+                existing[m.id] = existing[first_of[unique_id]]
+
+        stored_ids = list(dict.fromkeys(existing[m.id] for m in messages if existing[m.id] is not None))
+        failed = sum(1 for m in messages if existing[m.id] is None)
+        logger.debug("Bulk batch forwarded to storage channel", extra=fields(
+            user_id=first.from_user.id, files=len(messages), new=len(new_messages), failed=failed
+        ))
+        if not stored_ids:
+            raise Exception("Failed to forward messages to storage channel")
+
+        await bot_identity.get(client)
+        try:
+            links = [generate_batch_link(stored_ids)]
+        except ValueError:
+            # IDs too scattered for one link - fall back to one link per file
+            links = [generate_share_link(i) for i in stored_ids]
+
+        total_mb = sum(_file_size(m) for m in messages if existing[m.id] is not None) / (1024 * 1024)
+        link_text = "\n".join(links)
+        failed_text = f"\n⚠️ {failed} files could not be stored" if failed else ""
+        return await first.reply(
+            f"{FILE_UPLOAD_TEXT}\n\n"
+            f"📦 Bulk upload: {len(stored_ids)} files ({total_mb:.1f} MB)\n"
+            f"📎 Batch Link: {link_text}{failed_text}"
+        )
+    except Exception as e:
+        detailed_error = f"Error: {str(e)}"
+        logger.error("Bulk batch failed: %s", e, extra=fields(user_id=first.from_user.id, files=len(messages)))
+        await first.reply(f"❌ Failed to process {len(messages)} files\n{detailed_error}")
+        return None
+
+# Bulk mode: consecutive admin uploads are stored together after a quiet window
+bulk_ingest = BulkIngest(store_bulk_batch)
+
+async def handle_file(client, message: Message, bulk_mode=False):
+    if bulk_mode:
+        # Collected and answered with a single batch link by store_bulk_batch
+        bulk_ingest.add(client, message)
+        return None
+
+    try:
+        logger.debug("Processing file", extra=fields(user_id=message.from_user.id))
+
+        # Already stored? Hand out the existing link without touching the storage channel
+        existing_id = await file_index.afind_duplicate(describe_media(message)[0])
+        if existing_id is not None:
+            logger.debug("Duplicate upload, reusing stored file", extra=fields(
+                user_id=message.from_user.id, message_id=existing_id
+            ))
+            await bot_identity.get(client)
+            return await message.reply(
+                f"{FILE_UPLOAD_TEXT}\n\n"
+                f"📎 Share Link: {generate_share_link(existing_id)}"
+            )
+
+        # Forward to storage channel
+        stored_msg = await forward_to_storage(client, message.chat.id, message.id)
+        logger.debug("Forwarded to storage channel", extra=fields(
+            user_id=message.from_user.id, message_id=stored_msg.id
+        ))
+        file_index.record(stored_msg.id, message.from_user.id, message)
+
+        # Create share link (bot identity is cached, no get_me round-trip)
+        await bot_identity.get(client)
+        share_link = generate_share_link(stored_msg.id)
+
         # Send success message with link
         return await message.reply(
             f"{FILE_UPLOAD_TEXT}\n\n"
             f"📎 Share Link: {share_link}"
         )
-        
+
     except ChatAdminRequired:
         error_msg = "Bot needs admin rights with post messages permission in the storage channel"
-        print(f"Admin rights missing: {error_msg}")
+        logger.error("Admin rights missing: %s", error_msg)
         await message.reply(error_msg)
         return None
     except PeerIdInvalid:
         error_msg = "Storage channel ID is invalid. Ask admin to use /setchannel to set a valid channel"
-        print(f"Invalid channel ID: {error_msg}")
+        logger.error("Invalid channel ID: %s", error_msg)
         await message.reply(error_msg)
         return None
     except Exception as e:
         detailed_error = f"Error: {str(e)}"
-        print(detailed_error)
+        logger.error("Failed to process file: %s", e, extra=fields(user_id=message.from_user.id))
         await message.reply(f"❌ Failed to process file\n{detailed_error}")
         return None
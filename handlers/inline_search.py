@@ -0,0 +1,62 @@
+import asyncio
+
+from pyrogram.types import (
+    InlineQuery, InlineQueryResultArticle, InputTextMessageContent,
+    InlineKeyboardMarkup, InlineKeyboardButton
+)
+from handlers.file_handler import file_index
+from services.bot_identity import bot_identity
+from services.file_index import MIN_SEARCH_LENGTH
+from services.link_generator import generate_share_link
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+# Telegram shows at most 50 results per answer
+PAGE_SIZE = 20
+# Same query from anyone gets the same results, so Telegram may cache them
+CACHE_TIME = 300
+
+def _format_size(size):
+    if not size:
+        return "unknown size"
+    if size >= 1024 * 1024 * 1024:
+        return f"{size / (1024 * 1024 * 1024):.1f} GB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+def _result(row):
+    name = row["file_name"] or "Unnamed file"
+    link = generate_share_link(row["message_id"])
+    return InlineQueryResultArticle(
+        id=row["link_id"],
+        title=name,
+        description=f"{_format_size(row['file_size'])} • {row['mime_type'] or 'file'}",
+        input_message_content=InputTextMessageContent(f"📁 {name}\n\n📎 Share Link: {link}"),
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("📥 Get File", url=link)]])
+    )
+
+async def handle_inline_query(client, inline_query: InlineQuery):
+    query = inline_query.query.strip()
+    if len(query) < MIN_SEARCH_LENGTH:
+        # Too short for the trigram index
+        await inline_query.answer([], cache_time=CACHE_TIME)
+        return
+
+    try:
+        offset = int(inline_query.offset or 0)
+    except ValueError:
+        offset = 0
+
+    try:
+        rows = await asyncio.to_thread(file_index.search, query, PAGE_SIZE, offset)
+    except Exception as e:
+        logger.exception("Inline search failed")
+        rows = []
+
+    await bot_identity.get(client)
+    await inline_query.answer(
+        [_result(row) for row in rows],
+        cache_time=CACHE_TIME,
+        is_personal=False,
+        next_offset=str(offset + PAGE_SIZE) if len(rows) == PAGE_SIZE else ""
+    )
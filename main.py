@@ -1,18 +1,27 @@
 from pyrogram import Client, filters, idle
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
+from pyrogram.errors import UserNotParticipant
+from pyrogram.handlers import MessageHandler, CallbackQueryHandler, InlineQueryHandler
 from config import (
     API_ID, API_HASH, BOT_TOKEN, 
-    STORAGE_CHANNEL, POST_CHANNEL
+    STORAGE_CHANNEL, POST_CHANNEL, STORAGE_SEND_RATE, STORAGE_SEND_BURST,
+    METRICS_HOST, METRICS_PORT, RECORD_UPDATES
 )
-from handlers.file_handler import handle_file
-from handlers.auth import check_subscription, get_subscribe_markup
+from handlers.file_handler import handle_file, storage_target, file_index
+from handlers.inline_search import handle_inline_query
+from handlers.auth import get_subscribe_markup, membership_cache, membership_mirror
 from handlers.admin_handler import (
     load_admin_config,
+    get_admin_config,
     show_settings,
     show_contact_info,
     handle_set_image,
     handle_set_caption,
     show_admin_settings,
+    show_admin_management,
+    handle_set_admin,
+    handle_add_admin,
+    handle_del_admin,
     toggle_bulk_mode,
     is_admin,
     is_bulk_mode_enabled,
@@ -22,88 +31,235 @@ from handlers.admin_handler import (
     show_bot_settings,
     toggle_auto_accept,
     toggle_maintenance,
+    show_stats,
     handle_set_storage,
     handle_set_force_sub,
     handle_set_file_size,
     is_maintenance_mode,
-    save_admin_config
+    save_admin_config,
+    config_store,
+    welcome_media,
+    force_sub_peer
 )
-from services.link_generator import decode_file_id
+from services.link_generator import decode_message_ids
+from services.single_flight import coalesced, single_flight
+from services.bot_identity import bot_identity
+from services.delivery import delivery_engine, DeliveryResult, ProgressMessage
+from services.outbound import ThrottledClient, flood_wait_seconds, is_retryable, outbound
+from services.outbox import Outbox
+from services.log import get_logger, fields, timed
+from services import metrics
+from services.update_recorder import UpdateRecorder
+from services.state_store import TTLStore, PersistentTTLStore
+from services.membership_mirror import is_member_status, is_admin_status
+from services.callback_router import CallbackRouter, parse_callback_data
+import asyncio
 import os
 
-print(f"Initializing bot with API_ID: {API_ID}")
-app = Client(
+logger = get_logger("main")
+
+logger.info("Initializing bot", extra=fields(api_id=API_ID))
+# Uploads and bulk ingest write to the storage channel at its own limit
+outbound.set_chat_limit(STORAGE_CHANNEL, rate=STORAGE_SEND_RATE, burst=STORAGE_SEND_BURST)
+
+# Every API call goes through the shared outbound rate limiter
+app = ThrottledClient(
     "mybot",
     api_id=API_ID,
     api_hash=API_HASH,
     bot_token=BOT_TOKEN
 )
 
-# Store user's requested files and states
-user_requests = {}
-user_states = {}
+# Opt-in capture of incoming updates; group -1 sees them before the real handlers
+if RECORD_UPDATES:
+    update_recorder = UpdateRecorder(RECORD_UPDATES)
+    for handler_class in (MessageHandler, CallbackQueryHandler, InlineQueryHandler):
+        app.add_handler(handler_class(update_recorder.on_update), group=-1)
+    logger.info("Recording updates", extra=fields(path=RECORD_UPDATES))
+
+# Store user's requested files and states. Both expire and are bounded, so
+# visitors who never come back do not pile up in memory. Pending deep-link
+# requests are also kept on disk, so "Try Again" still works after a restart
+user_requests = PersistentTTLStore("config/pending_requests.db", ttl=24 * 3600, max_size=100_000)
+user_states = TTLStore(ttl=10 * 60, max_size=1000)
 
 # Load admin config
-config = load_admin_config()
-FORCE_SUB_CHANNEL = config["force_sub_channel"]
+config = get_admin_config()
 
-async def check_subscription(client, user_id):
+async def fetch_membership(client, user_id) -> bool:
+    """Live membership check, one (coalesced) get_chat_member call"""
+    # Numeric peer once resolved, so this never costs a username lookup
+    channel = force_sub_peer.target
+    logger.debug("Checking subscription", extra=fields(user_id=user_id, channel=channel))
     try:
-        print(f"Checking subscription for user {user_id} in channel {FORCE_SUB_CHANNEL}")
-        member = await client.get_chat_member(FORCE_SUB_CHANNEL, user_id)
-        print(f"Member status: {member.status}")
-        
-        if str(member.status) in ["member", "administrator", "creator", 
-                                 "ChatMemberStatus.MEMBER", 
-                                 "ChatMemberStatus.ADMINISTRATOR", 
-                                 "ChatMemberStatus.OWNER"]:
-            print(f"User {user_id} is subscribed")
-            return True
-        else:
-            print(f"User {user_id} is not subscribed (status: {member.status})")
-            return False
-            
-    except Exception as e:
-        print(f"Error checking subscription for user {user_id}: {str(e)}")
+        member = await coalesced(client, "get_chat_member", channel, user_id)
+    except UserNotParticipant:
+        logger.debug("User is not subscribed (not a participant)", extra=fields(user_id=user_id))
         return False
+    logger.debug("Member status", extra=fields(user_id=user_id, status=member.status))
+    return is_member_status(member.status)
+
+async def check_subscription(client, user_id, confirm_negative=False):
+    # Join/leave updates pushed by Telegram answer most checks for free.
+    # "Try Again" passes confirm_negative: a missed join update or a cached
+    # "not joined" must not lock out someone who just joined
+    mirrored = membership_mirror.get(user_id, force_sub_peer.chat_id)
+    if mirrored or (mirrored is False and not confirm_negative):
+        return mirrored
+
+    channel = force_sub_peer.target
+    cached = membership_cache.get(channel, user_id)
+    if cached or (cached is False and not confirm_negative):
+        return cached
 
-async def send_requested_file(client, chat_id, file_id):
     try:
-        sent_msg = await client.copy_message(
-            chat_id=chat_id,
-            from_chat_id=STORAGE_CHANNEL,
-            message_id=file_id
-        )
-        # Add random reaction
+        is_member = await fetch_membership(client, user_id)
+    except Exception as e:
+        logger.warning("Error checking subscription: %s", e, extra=fields(user_id=user_id))
+        return False
+
+    logger.debug("Subscription checked", extra=fields(user_id=user_id, subscribed=is_member))
+    membership_cache.set(channel, user_id, is_member)
+    if membership_mirror.serves(force_sub_peer.chat_id):
+        membership_mirror.observe(user_id, is_member)
+    return is_member
+
+async def audit_membership_mirror(interval=1800, sample=50):
+    """Periodically measure how far the mirror drifted from live checks"""
+    while True:
+        await asyncio.sleep(interval)
+        if not membership_mirror.serves(force_sub_peer.chat_id):
+            continue
+        try:
+            await membership_mirror.audit(lambda user_id: fetch_membership(app, user_id), sample)
+        except Exception as e:
+            logger.warning("Membership mirror audit failed: %s", e)
+
+# Requests from this many files get a progress message; without one the
+# user sees nothing until a whole bulk batch has been posted
+PROGRESS_MIN_FILES = 10
+
+async def deliver_files(client, chat_id, file_ids, progress=True):
+    # A deep link can carry a single file, a range or a list of files
+    if len(file_ids) == 1:
+        try:
+            sent_msg = await client.copy_message(
+                chat_id=chat_id,
+                from_chat_id=STORAGE_CHANNEL,
+                message_id=file_ids[0]
+            )
+        except Exception as e:
+            return DeliveryResult(0, list(file_ids), e)
+        # Add random reaction (a failed reaction is not a failed delivery)
         if sent_msg:
-            await sent_msg.react(get_random_reaction())
+            try:
+                await sent_msg.react(get_random_reaction())
+            except Exception as e:
+                logger.debug("Error adding reaction: %s", e, extra=fields(chat_id=chat_id))
+        return DeliveryResult(1, [])
+
+    # Multi-file requests go out in bulk copy batches; a progress message is
+    # shown once the request is big enough to keep the user waiting
+    reporter = None
+    if progress and len(file_ids) >= PROGRESS_MIN_FILES:
+        reporter = ProgressMessage(client, chat_id)
+        try:
+            await reporter.start(len(file_ids))
+        except Exception as e:
+            logger.warning("Error sending progress message: %s", e, extra=fields(chat_id=chat_id))
+
+    return await delivery_engine.deliver(client, chat_id, STORAGE_CHANNEL, file_ids, progress=reporter)
+
+async def send_requested_file(client, chat_id, file_id):
+    result = await deliver_files(client, chat_id, [file_id])
+    if result.error:
+        logger.warning("Error sending file: %s", result.error, extra=fields(chat_id=chat_id, file_id=file_id))
+    return result.ok
+
+async def send_requested_files(client, chat_id, file_ids):
+    result = await deliver_files(client, chat_id, file_ids)
+    if result.ok:
+        return True
+
+    logger.warning("Error sending files: %s", result.error,
+                   extra=fields(chat_id=chat_id, sent=result.sent, total=len(file_ids)))
+    if not is_retryable(result.error):
+        # Retrying can't fix a deleted source or a blocked bot - say so now
+        try:
+            await client.send_message(chat_id, f"❌ {len(result.remaining)} of {len(file_ids)} files could not be delivered. They may have been removed.")
+        except Exception as e:
+            logger.warning("Error sending failure notice: %s", e, extra=fields(chat_id=chat_id))
         return True
+
+    # Don't lose the request - the outbox worker retries it with backoff
+    try:
+        await outbox.add(chat_id, result.remaining, result.error)
     except Exception as e:
-        print(f"Error sending file: {str(e)}")
+        logger.error("Error queueing delivery: %s", e, extra=fields(chat_id=chat_id))
         return False
+    try:
+        await client.send_message(chat_id, "⏳ We're a bit busy right now. Your files are queued and will be delivered shortly.")
+    except Exception as e:
+        logger.warning("Error sending queued notice: %s", e, extra=fields(chat_id=chat_id))
+    return True
+
+async def deliver_queued(chat_id, file_ids):
+    result = await deliver_files(app, chat_id, file_ids, progress=False)
+    return result.remaining, result.error
+
+# Failed deliveries are persisted and retried in the background
+outbox = Outbox("config/outbox.db", deliver_queued, flood_wait_of=flood_wait_seconds, retryable=is_retryable)
+
+# Cache and queue counters, read from each component's stats() when scraped
+metrics.stats_collector("bot_membership_cache_total", "Subscription cache lookups",
+                        membership_cache.stats, ("hits", "misses"))
+metrics.stats_collector("bot_membership_mirror_total", "Subscription checks answered by the member mirror",
+                        membership_mirror.stats, ("hits", "misses", "events", "audited", "audit_mismatches"))
+metrics.registry.collector("bot_membership_mirror_users", "Users known to the member mirror", ("kind",),
+                           lambda: {(kind,): membership_mirror.stats()[kind] for kind in ("members", "non_members")})
+metrics.stats_collector("bot_single_flight_total", "Coalesced API lookups (shared = saved calls)",
+                        single_flight.stats, ("calls", "shared"))
+metrics.stats_collector("bot_upload_dedup_total", "Upload deduplication lookups",
+                        file_index.dedup_stats, ("hits", "misses"))
+metrics.stats_collector("bot_search_cache_total", "Inline search cache lookups",
+                        lambda: {"hits": file_index.search_hits, "misses": file_index.search_misses}, ("hits", "misses"))
+metrics.stats_collector("bot_outbound_total", "Calls through the outbound rate limiter",
+                        outbound.stats, ("calls", "throttled", "flood_waits"))
+metrics.registry.collector("bot_outbox_pending", "Deliveries waiting for a retry", (),
+                           lambda: {(): outbox.pending()})
+for store_name, store in (("requests", user_requests), ("states", user_states)):
+    metrics.stats_collector(f"bot_user_{store_name}_removed_total", f"Pending user {store_name} dropped before use",
+                            store.stats, ("expired", "evicted"))
+metrics.stats_collector("bot_pending_requests_disk_total", "Pending request store disk activity",
+                        user_requests.stats, ("writes", "disk_reads", "swept"))
+metrics.registry.collector("bot_user_state_entries", "Entries held in the per-user stores", ("store",),
+                           lambda: {("requests",): len(user_requests), ("states",): len(user_states)})
+metrics.registry.collector("bot_user_state_bytes", "Approximate memory held by the per-user stores", ("store",),
+                           lambda: {("requests",): user_requests.memory_bytes(),
+                                    ("states",): user_states.memory_bytes()})
 
 # Command handlers
 @app.on_message(filters.command(["start"]))
+@timed
 async def start_command(client, message: Message):
     try:
         user_id = message.from_user.id
         user_mention = message.from_user.mention
-        print(f"Start command received from user {user_id}")
+        logger.debug("Start command received", extra=fields(user_id=user_id))
         
-        # Always reload config to get latest changes
-        config = load_admin_config()
-        print(f"Loaded config: {config}")  # Debug print
+        # Cached snapshot, refreshed automatically when the config changes
+        config = get_admin_config()
         
         is_subscribed = await check_subscription(client, user_id)
-        print(f"Subscription check result for user {user_id}: {is_subscribed}")
+        logger.debug("Subscription check result", extra=fields(user_id=user_id, subscribed=is_subscribed))
         
         # Check if there's a deep link parameter
         command_parts = message.text.split()
         has_file_request = len(command_parts) > 1
         
         if has_file_request:
-            file_id = decode_file_id(command_parts[1])
-            user_requests[user_id] = file_id
+            file_ids = decode_message_ids(command_parts[1])
+            user_requests[user_id] = file_ids
         
         if not is_subscribed:
             buttons = [[
@@ -112,9 +268,9 @@ async def start_command(client, message: Message):
             ]]
         else:
             if has_file_request:
-                success = await send_requested_file(client, message.chat.id, file_id)
+                success = await send_requested_files(client, message.chat.id, file_ids)
                 if success:
-                    user_requests.pop(user_id, None)
+                    await user_requests.apop(user_id)
                     return
                 else:
                     await message.reply("✅ Thanks For Using Me Bro!.")
@@ -124,15 +280,14 @@ async def start_command(client, message: Message):
         
         # Get the welcome caption from config and format it
         caption = config["welcome_caption"].format(user_mention=user_mention)
-        print(f"Formatted caption: {caption}")  # Debug print
         
         reply_markup = InlineKeyboardMarkup(buttons)
         
-        # Send welcome message with image if exists
-        if os.path.exists(config["welcome_image"]):
-            await client.send_photo(
-                chat_id=message.chat.id,
-                photo=config["welcome_image"],
+        # Send welcome message with image if exists (reuses the cached file_id)
+        if welcome_media.exists():
+            await welcome_media.send_photo(
+                client,
+                message.chat.id,
                 caption=caption,
                 reply_markup=reply_markup
             )
@@ -140,22 +295,49 @@ async def start_command(client, message: Message):
             await message.reply(caption, reply_markup=reply_markup)
 
     except Exception as e:
-        print(f"Error in start command: {e}")
+        logger.exception("Error in start command", extra=fields(user_id=message.from_user.id))
         await message.reply("❌ An error occurred")
 
 @app.on_message(filters.command(["settings"]))
+@timed
 async def settings_command(client, message: Message):
     await show_settings(client, message)
 
 @app.on_message(filters.command(["adminsettings"]))
+@timed
 async def admin_settings_command(client, message: Message):
     await show_admin_settings(client, message)
 
+@app.on_inline_query()
+@timed
+async def inline_search(client, inline_query):
+    await handle_inline_query(client, inline_query)
+
+@app.on_message(filters.command(["stats"]))
+@timed
+async def stats_command(client, message: Message):
+    if not is_admin(message.from_user.id):
+        await message.reply("❌ Only admins can use this command!")
+        return
+    await show_stats(client, message)
+
 @app.on_message(filters.command(["contactus"]))
+@timed
 async def contact_command(client, message: Message):
     await show_contact_info(client, message)
 
+@app.on_message(filters.command("addadmin") & filters.private)
+@timed
+async def add_admin_command(client, message: Message):
+    await handle_add_admin(client, message)
+
+@app.on_message(filters.command("deladmin") & filters.private)
+@timed
+async def del_admin_command(client, message: Message):
+    await handle_del_admin(client, message)
+
 @app.on_message(filters.command("setchannel") & filters.private)
+@timed
 async def set_channel_command(client, message: Message):
     user_id = message.from_user.id
     
@@ -229,7 +411,7 @@ async def set_channel_command(client, message: Message):
             )
     else:
         # No channel ID provided - show instructions
-        current_config = load_admin_config()
+        current_config = get_admin_config()
         current_channel = current_config.get("storage_channel", "Not set")
         
         await message.reply(
@@ -241,44 +423,57 @@ async def set_channel_command(client, message: Message):
             f"2. Use the channel ID that starts with -100..."
         )
 
-# Callback handlers
-@app.on_callback_query(filters.regex("^(check_sub|already_joined|set_image|set_caption|toggle_bulk|close_settings|contact_info|about|admin_settings|back_to_settings|file_settings|channel_settings|bot_settings|toggle_auto|toggle_maintenance|set_storage|set_force_sub|set_file_size)$"))
-async def handle_callbacks(client, callback_query):
-    try:
-        data = callback_query.data
-        user_id = callback_query.from_user.id
-        
-        if data == "back_to_settings":
-            if is_admin(user_id):
-                await show_admin_settings(client, callback_query.message)
-            else:
-                await show_settings(client, callback_query.message)
-            return
-        
-        if data in ["check_sub", "already_joined"]:
-            if data == "already_joined":
-                await callback_query.answer("You're already subscribed! ✅", show_alert=True)
-                return
-                
-            is_subscribed = await check_subscription(client, user_id)
-            if is_subscribed:
-                buttons = [[InlineKeyboardButton("✅ Already Joined", callback_data="already_joined")]]
-                await callback_query.message.edit_reply_markup(InlineKeyboardMarkup(buttons))
-                await callback_query.answer("✅ Thank you for joining! You can use the bot now.", show_alert=True)
-                
-                if user_id in user_requests:
-                    file_id = user_requests[user_id]
-                    success = await send_requested_file(client, callback_query.message.chat.id, file_id)
-                    if success:
-                        user_requests.pop(user_id)
-            else:
-                await callback_query.answer("⚠️ Please join the channel first!", show_alert=True)
-        
-        elif data == "contact_info":
-            await show_contact_info(client, callback_query.message)
-            
-        elif data == "about":
-            about_text = """
+# Callback handlers: one route per action, admin-only routes guarded by the router
+callbacks = CallbackRouter(is_admin)
+
+SETTING_PROMPTS = {
+    "set_image": "📸 Please send the new welcome image (send as photo)",
+    "set_caption": "✏️ Please send the new welcome caption text",
+    "set_storage": "📦 Please send the storage channel ID",
+    "set_force_sub": "🔔 Please send the force subscribe channel username (with @) or ID",
+    "set_file_size": "📊 Please send the maximum file size in MB (1-2048)",
+    "set_admin": "👥 **Add New Admin**\n\n"
+                 "Reply to a message from the user you want to make admin.\n\n"
+                 "Existing admins keep their access."
+}
+
+@callbacks.route("back_to_settings")
+async def back_to_settings_callback(client, callback_query):
+    user_id = callback_query.from_user.id
+    if is_admin(user_id):
+        await show_admin_settings(client, callback_query.message, user_id)
+    else:
+        await show_settings(client, callback_query.message, user_id)
+
+@callbacks.route("already_joined")
+async def already_joined_callback(client, callback_query):
+    await callback_query.answer("You're already subscribed! ✅", show_alert=True)
+
+@callbacks.route("check_sub")
+async def check_sub_callback(client, callback_query):
+    user_id = callback_query.from_user.id
+    is_subscribed = await check_subscription(client, user_id, confirm_negative=True)
+    if not is_subscribed:
+        await callback_query.answer("⚠️ Please join the channel first!", show_alert=True)
+        return
+
+    buttons = [[InlineKeyboardButton("✅ Already Joined", callback_data="already_joined")]]
+    await callback_query.message.edit_reply_markup(InlineKeyboardMarkup(buttons))
+    await callback_query.answer("✅ Thank you for joining! You can use the bot now.", show_alert=True)
+
+    file_ids = await user_requests.aget(user_id)
+    if file_ids:
+        success = await send_requested_files(client, callback_query.message.chat.id, file_ids)
+        if success:
+            await user_requests.apop(user_id)
+
+@callbacks.route("contact_info")
+async def contact_info_callback(client, callback_query):
+    await show_contact_info(client, callback_query.message)
+
+@callbacks.route("about")
+async def about_callback(client, callback_query):
+    about_text = """
 🤖 **About Ragnar File Store Bot**
 
 This bot helps you store and share files easily:
@@ -293,83 +488,66 @@ This bot helps you store and share files easily:
 
 All Rights Reserved © @ragnarlothbrockV
 """
-            await callback_query.message.edit_text(
-                about_text,
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Back", callback_data="back_to_settings")
-                ]])
-            )
-                
-        elif data == "close_settings":
-            await callback_query.message.delete()
-            
-        elif data == "admin_settings":
-            if is_admin(user_id):
-                await show_admin_settings(client, callback_query.message)
-            else:
-                await callback_query.answer("❌ Only admins can access these settings!", show_alert=True)
-                
-        # New settings menu handlers
-        elif data == "file_settings":
-            if is_admin(user_id):
-                await show_file_settings(client, callback_query.message)
-            else:
-                await callback_query.answer("❌ Only admins can access these settings!", show_alert=True)
-                
-        elif data == "channel_settings":
-            if is_admin(user_id):
-                await show_channel_settings(client, callback_query.message)
-            else:
-                await callback_query.answer("❌ Only admins can access these settings!", show_alert=True)
-                
-        elif data == "bot_settings":
-            if is_admin(user_id):
-                await show_bot_settings(client, callback_query.message)
-            else:
-                await callback_query.answer("❌ Only admins can access these settings!", show_alert=True)
-            
-        # Toggle handlers
-        elif data == "toggle_bulk":
-            if is_admin(user_id):
-                await toggle_bulk_mode(client, callback_query)
-            else:
-                await callback_query.answer("❌ Only admins can toggle bulk mode!", show_alert=True)
-                
-        elif data == "toggle_auto":
-            if is_admin(user_id):
-                await toggle_auto_accept(client, callback_query)
-            else:
-                await callback_query.answer("❌ Only admins can toggle auto accept!", show_alert=True)
-                
-        elif data == "toggle_maintenance":
-            if is_admin(user_id):
-                await toggle_maintenance(client, callback_query)
-            else:
-                await callback_query.answer("❌ Only admins can toggle maintenance mode!", show_alert=True)
-            
-        # Settings input handlers
-        else:
-            if is_admin(user_id):
-                user_states[user_id] = data
-                instructions = {
-                    "set_image": "📸 Please send the new welcome image (send as photo)",
-                    "set_caption": "✏️ Please send the new welcome caption text",
-                    "set_storage": "📦 Please send the storage channel ID",
-                    "set_force_sub": "🔔 Please send the force subscribe channel username (with @) or ID",
-                    "set_file_size": "📊 Please send the maximum file size in MB (1-2048)"
-                }
-                if data in instructions:
-                    await callback_query.message.reply(instructions[data])
-                    await callback_query.answer()
-            else:
-                await callback_query.answer("❌ Only admins can access these settings!", show_alert=True)
-            
+    await callback_query.message.edit_text(
+        about_text,
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Back", callback_data="back_to_settings")
+        ]])
+    )
+
+@callbacks.route("close_settings")
+async def close_settings_callback(client, callback_query):
+    await callback_query.message.delete()
+
+@callbacks.route("admin_settings", admin=True)
+async def admin_settings_callback(client, callback_query):
+    await show_admin_settings(client, callback_query.message, callback_query.from_user.id)
+
+@callbacks.route("admin_management", admin=True)
+async def admin_management_callback(client, callback_query, page="0"):
+    page = int(page) if page.isdigit() else 0
+    await show_admin_management(client, callback_query.message, callback_query.from_user.id, page)
+
+@callbacks.route("file_settings", admin=True)
+async def file_settings_callback(client, callback_query):
+    await show_file_settings(client, callback_query.message)
+
+@callbacks.route("channel_settings", admin=True)
+async def channel_settings_callback(client, callback_query):
+    await show_channel_settings(client, callback_query.message)
+
+@callbacks.route("bot_settings", admin=True)
+async def bot_settings_callback(client, callback_query):
+    await show_bot_settings(client, callback_query.message)
+
+@callbacks.route("show_stats", admin=True)
+async def show_stats_callback(client, callback_query):
+    await show_stats(client, callback_query.message)
+
+callbacks.route("toggle_bulk", admin=True, denied="❌ Only admins can toggle bulk mode!")(toggle_bulk_mode)
+callbacks.route("toggle_auto", admin=True, denied="❌ Only admins can toggle auto accept!")(toggle_auto_accept)
+callbacks.route("toggle_maintenance", admin=True, denied="❌ Only admins can toggle maintenance mode!")(toggle_maintenance)
+
+@callbacks.route(*SETTING_PROMPTS, admin=True)
+async def setting_prompt_callback(client, callback_query):
+    # The next private message from this admin is the new value
+    action, _ = parse_callback_data(callback_query.data)
+    user_states[callback_query.from_user.id] = action
+    await callback_query.message.reply(SETTING_PROMPTS[action])
+    await callback_query.answer()
+
+@app.on_callback_query(callbacks.filter)
+@timed
+async def handle_callbacks(client, callback_query):
+    try:
+        await callbacks.dispatch(client, callback_query)
     except Exception as e:
-        print(f"Callback error: {e}")
+        logger.exception("Callback error", extra=fields(data=callback_query.data))
         await callback_query.answer("❌ Error processing request", show_alert=True)
 
 # Handle responses to settings
 @app.on_message(filters.private & ~filters.command(["settings", "adminsettings", "start"]))
+@timed
 async def handle_settings_input(client, message: Message):
     user_id = message.from_user.id
     if user_id not in user_states:
@@ -384,7 +562,7 @@ async def handle_settings_input(client, message: Message):
         # Handle normal file uploads
         if message.document or message.video or message.audio:
             if not await check_subscription(client, user_id):
-                config = load_admin_config()
+                config = get_admin_config()
                 buttons = [[
                     InlineKeyboardButton("Join Channel 🔔", url=f"https://t.me/{config['force_sub_channel'].replace('@', '')}"),
                     InlineKeyboardButton("Try Again 🔄", callback_data="check_sub")
@@ -404,8 +582,7 @@ async def handle_settings_input(client, message: Message):
                 message.audio.file_size if message.audio else 0
             ) / (1024 * 1024)  # Convert to MB
             
-            config = load_admin_config()
-            max_size = config.get("max_file_size", 2048)
+            max_size = config_store.get_int("max_file_size", 2048)
             
             if file_size > max_size:
                 await message.reply(f"❌ File too large! Maximum size allowed is {max_size}MB")
@@ -425,120 +602,175 @@ async def handle_settings_input(client, message: Message):
 
     # Handle settings input
     if is_admin(user_id):
-        state = user_states[user_id]
+        state = user_states.get(user_id)
         handlers = {
             "set_image": handle_set_image,
             "set_caption": handle_set_caption,
             "set_storage": handle_set_storage,
             "set_force_sub": handle_set_force_sub,
-            "set_file_size": handle_set_file_size
+            "set_file_size": handle_set_file_size,
+            "set_admin": handle_set_admin
         }
         
         if state in handlers:
             await handlers[state](client, message)
-            user_states.pop(user_id)  # Clear the state after handling
+            user_states.pop(user_id, None)  # Clear the state after handling
+
+# Bot identity is cached; fetch it again after the session reconnects
+@app.on_disconnect()
+async def on_disconnect(client):
+    bot_identity.invalidate()
+
+# Joins and leaves in the force-sub channel keep the membership mirror current
+@app.on_chat_member_updated()
+@timed
+async def track_membership(client, update):
+    await membership_mirror.on_update(client, update)
 
 # Verify channel access at startup
 async def verify_channels(app):
     try:
         # Verify storage channel
-        print(f"Verifying storage channel: {STORAGE_CHANNEL}")
+        logger.info("Verifying storage channel", extra=fields(channel=STORAGE_CHANNEL))
         try:
-            storage_chat = await app.get_chat(STORAGE_CHANNEL)
-            storage_member = await app.get_chat_member(STORAGE_CHANNEL, "me")
+            # Resolve and pin the storage peer so uploads skip re-verification
+            await storage_target.resolve(app)
             
-            print(f"✅ Storage channel confirmed: {storage_chat.title}")
-            print(f"Bot permissions: {storage_member.status}")
+            logger.info("Storage channel confirmed: %s", storage_target.title, extra=fields(status=storage_target.status))
             
-            if not storage_member.can_post_messages:
-                print(f"WARNING: Bot doesn't have post permission in storage channel: {storage_chat.title}")
+            if not storage_target.can_post:
+                logger.warning("Bot doesn't have post permission in storage channel: %s", storage_target.title)
             else:
-                print(f"✅ Storage channel access OK: {storage_chat.title}")
+                logger.info("Storage channel access OK: %s", storage_target.title)
         except Exception as e:
-            print(f"❌ CRITICAL: Storage channel access failed: {str(e)}")
-            print(f"Please make sure the bot is a member and admin of the storage channel ID: {STORAGE_CHANNEL}")
-            print("Without storage channel access, file uploads will not work!")
+            logger.critical("Storage channel access failed: %s", e)
+            logger.critical("Please make sure the bot is a member and admin of the storage channel ID: %s", STORAGE_CHANNEL)
+            logger.critical("Without storage channel access, file uploads will not work!")
         
         # Verify post channel if different
         if POST_CHANNEL != STORAGE_CHANNEL:
             try:
-                post_chat = await app.get_chat(POST_CHANNEL)
-                post_member = await app.get_chat_member(POST_CHANNEL, "me")
+                post_chat = await coalesced(app, "get_chat", POST_CHANNEL)
+                post_member = await coalesced(app, "get_chat_member", POST_CHANNEL, "me")
                 
                 if not post_member.can_post_messages:
-                    print(f"WARNING: Bot doesn't have post permission in post channel: {post_chat.title}")
+                    logger.warning("Bot doesn't have post permission in post channel: %s", post_chat.title)
                 else:
-                    print(f"✅ Post channel access OK: {post_chat.title}")
+                    logger.info("Post channel access OK: %s", post_chat.title)
             except Exception as e:
-                print(f"❌ ERROR: Post channel access failed: {str(e)}")
+                logger.error("Post channel access failed: %s", e)
     
         # Verify force subscribe channel
-        if FORCE_SUB_CHANNEL:
+        force_sub_channel = force_sub_peer.target
+        if force_sub_channel:
             try:
-                force_chat = await app.get_chat(FORCE_SUB_CHANNEL)
-                force_member = await app.get_chat_member(FORCE_SUB_CHANNEL, "me")
+                force_chat = await coalesced(app, "get_chat", force_sub_channel)
+                force_member = await coalesced(app, "get_chat_member", force_sub_channel, "me")
+                
+                # As an admin the bot is sent every join/leave in the channel
+                if is_admin_status(force_member.status):
+                    membership_mirror.activate(force_chat.id)
+                    logger.info("Membership mirror active", extra=fields(channel=force_chat.id))
                 
                 if not force_member.can_post_messages:
-                    print(f"WARNING: Bot doesn't have post permission in force subscribe channel: {force_chat.title}")
+                    logger.warning("Bot doesn't have post permission in force subscribe channel: %s", force_chat.title)
                 else:
-                    print(f"✅ Force subscribe channel access OK: {force_chat.title}")
+                    logger.info("Force subscribe channel access OK: %s", force_chat.title)
             except Exception as e:
-                print(f"⚠️ Could not verify force subscribe channel: {e}")
-                print("Users may not be able to subscribe to use the bot!")
+                logger.warning("Could not verify force subscribe channel: %s", e)
+                logger.warning("Users may not be able to subscribe to use the bot!")
         
     except Exception as e:
-        print(f"ERROR verifying channels: {e}")
-        print("Make sure the bot is an admin in all channels with post permission.")
+        logger.error("Error verifying channels: %s", e)
+        logger.error("Make sure the bot is an admin in all channels with post permission.")
 
 # Main program
 if __name__ == "__main__":
     # First check if bot token is valid
     if BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
-        print("❌ CRITICAL ERROR: Bot token not set!")
-        print("Please update your bot token in config.py or set the BOT_TOKEN environment variable")
-        print("To get a new bot token:")
-        print("1. Go to @BotFather on Telegram")
-        print("2. Send /newbot and follow the instructions")
-        print("3. Copy the bot token and update config.py")
+        logger.critical("Bot token not set!")
+        logger.critical("Please update your bot token in config.py or set the BOT_TOKEN environment variable")
+        logger.critical("To get a new bot token:")
+        logger.critical("1. Go to @BotFather on Telegram")
+        logger.critical("2. Send /newbot and follow the instructions")
+        logger.critical("3. Copy the bot token and update config.py")
         exit(1)
         
     try:
         # Start bot
-        print("Starting bot...")
+        logger.info("Starting bot...")
         app.start()
         
+        # Metrics endpoint for handler/API latency, FloodWaits and cache hit rates
+        if METRICS_PORT:
+            try:
+                app.loop.run_until_complete(metrics.serve(METRICS_HOST, METRICS_PORT))
+            except OSError as e:
+                logger.warning("Could not start metrics endpoint: %s", e)
+        
+        # Cache bot identity and pre-render share links
+        try:
+            me = app.loop.run_until_complete(bot_identity.load(app))
+            logger.info("Running as @%s", me.username)
+        except Exception as e:
+            logger.warning("Could not fetch bot identity: %s", e)
+        
+        # Pin the force-sub channel to its numeric peer: seed Pyrogram's peer
+        # storage from the stored one, or resolve the username once now
+        try:
+            app.loop.run_until_complete(force_sub_peer.seed(app))
+            app.loop.run_until_complete(force_sub_peer.resolve(app))
+        except Exception as e:
+            logger.warning("Could not resolve force sub channel: %s", e)
+        
+        # Force-sub membership from the last snapshot; verify_channels turns
+        # the mirror on once it sees the bot is an admin there
+        membership_mirror.load()
+        
         # Verify channels
-        print("Verifying channel access...")
+        logger.info("Verifying channel access...")
         app.loop.create_task(verify_channels(app))
         
+        # Load known file_unique_ids so duplicate uploads are answered from memory
+        file_index.load_unique_ids()
+        
+        # Retry deliveries queued before the last restart or during load spikes
+        app.loop.create_task(outbox.run())
+        
+        app.loop.create_task(membership_mirror.run())
+        app.loop.create_task(audit_membership_mirror())
+        
         # Run bot until stopped
-        print("Bot is running!")
+        logger.info("Bot is running!")
         idle()
     except ValueError as e:
         if "bot token" in str(e).lower():
-            print("❌ ERROR: Invalid bot token. Please get a new token from @BotFather")
-            print(f"Details: {str(e)}")
+            logger.error("Invalid bot token. Please get a new token from @BotFather")
+            logger.error("Details: %s", e)
         else:
-            print(f"❌ ERROR: {str(e)}")
+            logger.error("%s", e)
     except ConnectionError as e:
-        print("❌ ERROR: Connection error - Failed to connect to Telegram servers")
-        print(f"Details: {str(e)}")
-        print("This may be due to an invalid bot token or network issues")
+        logger.error("Connection error - Failed to connect to Telegram servers")
+        logger.error("Details: %s", e)
+        logger.error("This may be due to an invalid bot token or network issues")
     except Exception as e:
-        print(f"❌ ERROR starting bot: {str(e)}")
-        print(f"Error type: {type(e).__name__}")
+        logger.error("Error starting bot: %s", e, extra=fields(error_type=type(e).__name__))
         
         if "USER_DEACTIVATED" in str(e):
-            print("\n❌ CRITICAL: Your bot has been deactivated!")
-            print("You need to get a new bot token from @BotFather")
-            print("1. Go to @BotFather on Telegram")
-            print("2. Send /newbot and follow the instructions")
-            print("3. Copy the new token and update config.py")
+            logger.critical("Your bot has been deactivated!")
+            logger.critical("You need to get a new bot token from @BotFather")
+            logger.critical("1. Go to @BotFather on Telegram")
+            logger.critical("2. Send /newbot and follow the instructions")
+            logger.critical("3. Copy the new token and update config.py")
     finally:
+        try:
+            membership_mirror.snapshot()
+        except Exception as e:
+            logger.warning("Could not write membership snapshot: %s", e)
         try:
             app.stop()
         except Exception as e:
             # This might fail if the app never started properly
-            print(f"Note: Could not properly stop the bot: {str(e)}")
+            logger.info("Could not properly stop the bot: %s", e)
             pass
-        print("Bot has been stopped.")
+        logger.info("Bot has been stopped.")
@@ -0,0 +1,115 @@
+from types import MappingProxyType
+
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+OWNER = "owner"
+ADMIN = "admin"
+ROLES = (OWNER, ADMIN)
+
+
+def parse_admins(value) -> dict:
+    """{user_id: role} from the config's "admins" value.
+
+    Accepts the old single ID, a list of IDs (both read as owners) or a
+    mapping of ID to role. Unparseable entries are skipped.
+    """
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, (list, tuple)):
+        items = ((user_id, OWNER) for user_id in value)
+    elif value is None:
+        items = ()
+    else:
+        items = ((value, OWNER),)
+
+    roles = {}
+    for user_id, role in items:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            logger.warning("Ignoring invalid admin ID: %r", user_id)
+            continue
+        if user_id:
+            roles[user_id] = role if role in ROLES else ADMIN
+    return roles
+
+
+class AdminDirectory:
+    """Bot admins and their roles, parsed once per config snapshot.
+
+    Lookups are a frozenset membership test; the config value is parsed
+    again only when the ConfigStore hands out a new snapshot (the file
+    changed or the bot saved). Owners may manage other admins; admins may
+    change settings. If the config lists nobody, ``default_owner`` is owner.
+    """
+
+    def __init__(self, store, key: str = "admins", default_owner: int = None):
+        self.store = store
+        self.key = key
+        self.default_owner = default_owner
+        self._snapshot = None
+        self._roles = MappingProxyType({})
+        self._ids = frozenset()
+        self._owners = frozenset()
+
+    def _refresh(self):
+        snapshot = self.store.snapshot()
+        if snapshot is not self._snapshot:
+            roles = parse_admins(snapshot.get(self.key))
+            if not roles and self.default_owner:
+                roles = {self.default_owner: OWNER}
+            self._roles = MappingProxyType(roles)
+            self._ids = frozenset(roles)
+            self._owners = frozenset(user_id for user_id, role in roles.items() if role == OWNER)
+            self._snapshot = snapshot
+
+    @property
+    def ids(self) -> frozenset:
+        self._refresh()
+        return self._ids
+
+    @property
+    def roles(self) -> MappingProxyType:
+        self._refresh()
+        return self._roles
+
+    def is_admin(self, user_id) -> bool:
+        self._refresh()
+        return user_id in self._ids
+
+    def is_owner(self, user_id) -> bool:
+        self._refresh()
+        return user_id in self._owners
+
+    def role(self, user_id):
+        return self.roles.get(user_id)
+
+    def _save(self, roles: dict) -> bool:
+        config = dict(self.store.snapshot())
+        config[self.key] = {str(user_id): role for user_id, role in roles.items()}
+        return self.store.save(config)
+
+    def add(self, user_id: int, role: str = ADMIN) -> bool:
+        """Grant role to user_id; False if they already have it"""
+        if role not in ROLES:
+            raise ValueError(f"Unknown role: {role}")
+        roles = dict(self.roles)
+        current = roles.get(user_id)
+        if current == role:
+            return False
+        roles[user_id] = role
+        if current == OWNER and not any(other == OWNER for other in roles.values()):
+            raise ValueError("Cannot demote the last owner")
+        return self._save(roles)
+
+    def remove(self, user_id: int) -> bool:
+        """Revoke user_id; False if they were not an admin"""
+        roles = dict(self.roles)
+        if user_id not in roles:
+            return False
+        role = roles.pop(user_id)
+        if role == OWNER and not any(other == OWNER for other in roles.values()):
+            raise ValueError("Cannot remove the last owner")
+        return self._save(roles)
@@ -0,0 +1,38 @@
+from services.link_generator import set_bot_username
+from services.single_flight import single_flight
+
+
+class BotIdentity:
+    """The bot's own get_me() result, fetched once and reused.
+
+    Loaded at startup and marked stale when the session disconnects, so it is
+    only fetched again after a reconnect. Loading also pre-renders the share
+    link prefix used by ``generate_share_link``.
+    """
+
+    def __init__(self):
+        self.me = None
+        self.loads = 0
+
+    @property
+    def username(self):
+        return self.me.username if self.me else None
+
+    async def load(self, client):
+        me = await single_flight.do(("get_me", id(client)), client.get_me)
+        if self.me is None or self.me.username != me.username:
+            set_bot_username(me.username)
+        self.me = me
+        self.loads += 1
+        return me
+
+    async def get(self, client):
+        if self.me is None:
+            return await self.load(client)
+        return self.me
+
+    def invalidate(self):
+        self.me = None
+
+
+bot_identity = BotIdentity()
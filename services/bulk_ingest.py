@@ -0,0 +1,70 @@
+import asyncio
+
+from services.delivery import MAX_BATCH_SIZE
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class BulkIngest:
+    """Collects a user's consecutive uploads into one batch.
+
+    Each ``add`` restarts a quiet-window timer for that user's chat. Once no
+    new upload has arrived for ``quiet_window`` seconds (or ``max_batch``
+    messages are waiting) the batch is handed to ``store_batch(client,
+    messages)`` in upload order.
+    """
+
+    def __init__(self, store_batch, quiet_window: float = 3.0, max_batch: int = MAX_BATCH_SIZE):
+        self.store_batch = store_batch
+        self.quiet_window = quiet_window
+        self.max_batch = max_batch
+        self._sessions = {}
+        # Running flushes; the loop only keeps weak references to tasks
+        self._tasks = set()
+        self.batches = 0
+
+    def add(self, client, message):
+        key = (message.chat.id, message.from_user.id)
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = {"messages": [], "timer": None}
+        session["messages"].append(message)
+
+        if session["timer"] is not None:
+            session["timer"].cancel()
+        if len(session["messages"]) >= self.max_batch:
+            session["timer"] = None
+            self._spawn(client, key)
+        else:
+            loop = asyncio.get_running_loop()
+            session["timer"] = loop.call_later(self.quiet_window, self._spawn, client, key)
+        return len(session["messages"])
+
+    def _spawn(self, client, key):
+        task = asyncio.ensure_future(self.flush(client, key))
+        self._tasks.add(task)
+        task.add_done_callback(self._flushed)
+
+    def _flushed(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Bulk batch flush failed", exc_info=task.exception())
+
+    def pending(self, chat_id, user_id) -> int:
+        session = self._sessions.get((chat_id, user_id))
+        return len(session["messages"]) if session else 0
+
+    async def flush(self, client, key):
+        session = self._sessions.pop(key, None)
+        if not session or not session["messages"]:
+            return
+        if session["timer"] is not None:
+            session["timer"].cancel()
+
+        messages = sorted(session["messages"], key=lambda m: m.id)
+        self.batches += 1
+        try:
+            await self.store_batch(client, messages)
+        except Exception as e:
+            logger.exception("Error storing bulk batch")
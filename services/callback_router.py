@@ -0,0 +1,100 @@
+import inspect
+from collections import namedtuple
+
+from pyrogram import filters
+
+from services.log import get_logger, fields
+
+logger = get_logger(__name__)
+
+# Telegram rejects callback_data longer than this
+MAX_CALLBACK_DATA = 64
+
+Route = namedtuple("Route", "handler admin denied min_params max_params")
+
+
+def callback_data(action: str, *params) -> str:
+    """Build "action" or "action:param[:param...]" callback data"""
+    data = ":".join([action, *(str(param) for param in params)])
+    if len(data.encode("utf-8")) > MAX_CALLBACK_DATA:
+        raise ValueError(f"Callback data too long: {data!r}")
+    return data
+
+
+def param_range(func) -> tuple:
+    """(fewest, most) callback params func accepts after (client, callback_query)"""
+    positional = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    fewest = most = 0
+    for parameter in inspect.signature(func).parameters.values():
+        if parameter.kind == inspect.Parameter.VAR_POSITIONAL:
+            most = float("inf")
+        elif parameter.kind in positional:
+            most += 1
+            if parameter.default is inspect.Parameter.empty:
+                fewest += 1
+    return max(fewest - 2, 0), most - 2
+
+
+def parse_callback_data(data) -> tuple:
+    """Split callback data into (action, params)"""
+    if isinstance(data, bytes):
+        data = data.decode("utf-8", "replace")
+    action, *params = (data or "").split(":")
+    return action, params
+
+
+class CallbackRouter:
+    """One table from callback action to handler.
+
+    Callback data is ``action`` optionally followed by ``:param`` parts
+    (page numbers, IDs, as strings); handlers are called as
+    ``handler(client, callback_query, *params)``, and data with more or fewer
+    params than the handler takes is answered as expired instead. Build the
+    data with ``callback_data`` so it fits Telegram's limit. Routes declared with
+    ``admin=True`` are refused with an alert before the handler runs, so
+    handlers never repeat the check. Dispatch is a single dict lookup.
+    """
+
+    def __init__(self, is_admin, denied: str = "❌ Only admins can access these settings!"):
+        self.is_admin = is_admin
+        self.denied = denied
+        self._routes = {}
+
+        # A coroutine: Pyrogram runs plain-function filters in a thread pool
+        async def check(flt, client, query):
+            return self.matches(query.data)
+        self.filter = filters.create(check)
+
+    def route(self, *actions, admin: bool = False, denied: str = None):
+        """Decorator registering a handler for one or more actions"""
+        def decorator(func):
+            for action in actions:
+                if action in self._routes:
+                    raise ValueError(f"Callback action already routed: {action}")
+                self._routes[action] = Route(func, admin, denied or self.denied, *param_range(func))
+            return func
+        return decorator
+
+    @property
+    def actions(self):
+        return frozenset(self._routes)
+
+    def matches(self, data) -> bool:
+        return parse_callback_data(data)[0] in self._routes
+
+    async def dispatch(self, client, callback_query) -> bool:
+        """Run the handler for this query; False if no route matches"""
+        action, params = parse_callback_data(callback_query.data)
+        route = self._routes.get(action)
+        if route is None:
+            return False
+        if route.admin and not self.is_admin(callback_query.from_user.id):
+            await callback_query.answer(route.denied, show_alert=True)
+            return True
+        if not route.min_params <= len(params) <= route.max_params:
+            # Buttons from an older layout of this menu
+            logger.debug("Callback params don't fit the handler", extra=fields(data=callback_query.data))
+            await callback_query.answer("⚠️ This button has expired, please reopen the menu.", show_alert=True)
+            return True
+        await route.handler(client, callback_query, *params)
+        return True
@@ -0,0 +1,198 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from types import MappingProxyType
+
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def write_atomic(path: str, data: str):
+    """Replace path with data via temp file + fsync + rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class ConfigStore:
+    """Keeps one parsed, read-only snapshot of a JSON config file in memory.
+
+    The file is only re-parsed when its inode, mtime or size changes (checked
+    at most once per ``check_interval`` seconds) or when the bot itself saves
+    a new config.
+
+    Saves swap the snapshot in immediately and are persisted by a background
+    writer thread. Rapid successive saves within ``write_delay`` seconds are
+    coalesced into one write, and every write goes through a temp file,
+    fsync and rename so the file on disk is always either the old or the new
+    config, never a partial one.
+    """
+
+    def __init__(self, path: str, default_factory, check_interval: float = 1.0,
+                 write_delay: float = 0.2, retry_delay: float = 2.0):
+        self.path = path
+        self.default_factory = default_factory
+        self.check_interval = check_interval
+        self.write_delay = write_delay
+        self.retry_delay = retry_delay
+        self.reloads = 0
+        self.writes = 0
+        self._snapshot = None
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.RLock()
+        self._pending = None
+        self._wakeup = threading.Condition(self._lock)
+        self._writer = None
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error("Error loading admin config: %s", e)
+            return None
+
+    def _refresh(self, now: float):
+        with self._lock:
+            self._next_check = now + self.check_interval
+            if self._pending is not None:
+                # Our own unwritten save is newer than anything on disk
+                return
+            signature = self._stat_signature()
+            if self._snapshot is not None and signature == self._signature:
+                return
+
+            data = self._read()
+            if data is None:
+                if self._snapshot is not None:
+                    # Keep serving the last good snapshot
+                    self._signature = signature
+                    return
+                data = self.default_factory()
+                self.save(data)
+                return
+
+            self._snapshot = MappingProxyType(data)
+            self._signature = signature
+            self.reloads += 1
+
+    def snapshot(self) -> MappingProxyType:
+        """Return the current read-only config snapshot"""
+        now = time.monotonic()
+        if self._snapshot is None or now >= self._next_check:
+            self._refresh(now)
+        return self._snapshot
+
+    def save(self, config: dict) -> bool:
+        """Swap config in as the new snapshot and queue it for writing"""
+        try:
+            data = json.dumps(config, indent=4)
+        except (TypeError, ValueError) as e:
+            logger.error("Error saving admin config: %s", e)
+            return False
+
+        with self._lock:
+            self._snapshot = MappingProxyType(json.loads(data))
+            self._pending = data
+            self._next_check = time.monotonic() + self.check_interval
+            self._ensure_writer()
+            self._wakeup.notify()
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until queued saves are on disk"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._wakeup.notify()
+            while self._pending is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._wakeup.wait(remaining)
+        return True
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(
+                target=self._write_loop, name="config-writer", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self.flush)
+
+    def _write_loop(self):
+        while True:
+            with self._lock:
+                while self._pending is None:
+                    self._wakeup.wait()
+            # Let rapid successive saves coalesce into one write
+            time.sleep(self.write_delay)
+            with self._lock:
+                data = self._pending
+
+            try:
+                write_atomic(self.path, data)
+            except Exception as e:
+                logger.error("Error saving admin config: %s", e)
+                time.sleep(self.retry_delay)
+                continue
+
+            with self._lock:
+                self.writes += 1
+                if self._pending is data:
+                    self._pending = None
+                    self._signature = self._stat_signature()
+                self._wakeup.notify_all()
+
+    # Typed accessors
+    def get(self, key: str, default=None):
+        return self.snapshot().get(key, default)
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        return bool(self.snapshot().get(key, default))
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        try:
+            return int(self.snapshot().get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def get_str(self, key: str, default: str = "") -> str:
+        value = self.snapshot().get(key, default)
+        return default if value is None else str(value)
@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class Database:
+    """One SQLite connection in WAL mode, shared by the bot's worker threads.
+
+    Every statement runs under a lock; async callers should go through
+    ``asyncio.to_thread`` so disk I/O stays off the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+
+    def execute(self, sql: str, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params)
+
+    @contextmanager
+    def transaction(self):
+        """Connection for several statements committed together"""
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def executemany(self, sql: str, rows):
+        with self.transaction() as conn:
+            conn.executemany(sql, rows)
+
+    def executescript(self, script: str):
+        with self.lock:
+            self.conn.executescript(script)
+
+    def query(self, sql: str, params=()) -> list:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+from pyrogram import raw
+
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+# Telegram accepts at most this many message IDs per forward/copy request
+MAX_BATCH_SIZE = 100
+
+
+async def copy_messages(client, chat_id, from_chat_id, message_ids):
+    """Copy several messages in one request (forward without the author)"""
+    if hasattr(client, "copy_messages"):
+        return await client.copy_messages(chat_id=chat_id, from_chat_id=from_chat_id, message_ids=message_ids)
+
+    # Older Pyrogram has no copy_messages - messages.forwardMessages with
+    # drop_author is the same MTProto call
+    return await client.invoke(
+        raw.functions.messages.ForwardMessages(
+            to_peer=await client.resolve_peer(chat_id),
+            from_peer=await client.resolve_peer(from_chat_id),
+            id=list(message_ids),
+            random_id=[client.rnd_id() for _ in message_ids],
+            drop_author=True
+        )
+    )
+
+
+class DeliveryResult:
+    __slots__ = ("sent", "remaining", "error")
+
+    def __init__(self, sent, remaining, error=None):
+        self.sent = sent
+        self.remaining = remaining
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return not self.remaining
+
+
+class DeliveryEngine:
+    """Delivers stored messages to a chat in bulk copy batches.
+
+    Message IDs are split into the largest batches the API accepts and sent
+    in order. At most ``per_chat_limit`` batches are in flight per chat and
+    ``global_limit`` across all chats. After each batch the optional
+    ``progress(sent, total)`` coroutine is awaited.
+    """
+
+    def __init__(self, batch_size: int = MAX_BATCH_SIZE, per_chat_limit: int = 1,
+                 global_limit: int = 8, copy_batch=copy_messages):
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.per_chat_limit = per_chat_limit
+        self.copy_batch = copy_batch
+        self._global = asyncio.Semaphore(global_limit)
+        self._chats = {}
+        self.batches = 0
+        self.messages = 0
+
+    def _chat_slot(self, chat_id):
+        slot = self._chats.get(chat_id)
+        if slot is None:
+            slot = self._chats[chat_id] = [asyncio.Semaphore(self.per_chat_limit), 0]
+        slot[1] += 1
+        return slot
+
+    def _release_chat_slot(self, chat_id, slot):
+        slot[1] -= 1
+        if slot[1] == 0 and self._chats.get(chat_id) is slot:
+            del self._chats[chat_id]
+
+    async def deliver(self, client, chat_id, from_chat_id, message_ids, progress=None) -> DeliveryResult:
+        message_ids = list(message_ids)
+        total = len(message_ids)
+        sent = 0
+        slot = self._chat_slot(chat_id)
+        try:
+            for start in range(0, total, self.batch_size):
+                batch = message_ids[start:start + self.batch_size]
+                try:
+                    async with slot[0], self._global:
+                        await self.copy_batch(client, chat_id, from_chat_id, batch)
+                except Exception as e:
+                    return DeliveryResult(sent, message_ids[start:], e)
+
+                sent += len(batch)
+                self.batches += 1
+                self.messages += len(batch)
+                if progress is not None:
+                    try:
+                        await progress(sent, total)
+                    except Exception as e:
+                        logger.warning("Error reporting delivery progress: %s", e)
+        finally:
+            self._release_chat_slot(chat_id, slot)
+        return DeliveryResult(sent, [])
+
+
+class ProgressMessage:
+    """Edits one status message as a delivery advances (rate-limited)"""
+
+    def __init__(self, client, chat_id, min_interval: float = 2.0):
+        self.client = client
+        self.chat_id = chat_id
+        self.min_interval = min_interval
+        self.message = None
+        self._last_edit = 0.0
+
+    async def start(self, total):
+        self.message = await self.client.send_message(self.chat_id, f"📤 Sending {total} files...")
+        self._last_edit = time.monotonic()
+
+    async def __call__(self, sent, total):
+        if self.message is None:
+            return
+        now = time.monotonic()
+        if sent < total and now - self._last_edit < self.min_interval:
+            return
+        self._last_edit = now
+        if sent < total:
+            await self.message.edit_text(f"📤 Sending files... {sent}/{total}")
+        else:
+            await self.message.edit_text(f"✅ Sent {total} files")
+
+
+delivery_engine = DeliveryEngine()
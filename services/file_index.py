@@ -0,0 +1,359 @@
+import asyncio
+import atexit
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from services.db import Database
+from services.log import get_logger
+from services.link_generator import encode_file_id
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    message_id INTEGER PRIMARY KEY,
+    link_id TEXT NOT NULL UNIQUE,
+    uploader_id INTEGER,
+    file_unique_id TEXT,
+    file_name TEXT,
+    mime_type TEXT,
+    file_size INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_unique_id ON files (file_unique_id);
+CREATE INDEX IF NOT EXISTS files_uploader ON files (uploader_id, created_at);
+CREATE INDEX IF NOT EXISTS files_created ON files (created_at);
+"""
+
+# Trigram index over file names, so any 3+ character substring is an index lookup.
+# Rows are keyed by -message_id: FTS5 walks doclists much faster in ascending
+# rowid order, and ascending here means newest first. Needs SQLite 3.34+ built
+# with FTS5; without it search falls back to a LIKE scan of the files table.
+SEARCH_SCHEMA = (
+    "CREATE VIRTUAL TABLE files_search USING fts5(file_name, tokenize='trigram')",
+    "INSERT INTO files_search (rowid, file_name) "
+    "SELECT -message_id, file_name FROM files WHERE file_name IS NOT NULL",
+)
+
+MIN_SEARCH_LENGTH = 3
+
+# A word with at most this many matches is filtered directly instead of joined
+RARE_WORD_LIMIT = 500
+
+
+def _phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+logger = get_logger(__name__)
+
+COLUMNS = ("message_id", "link_id", "uploader_id", "file_unique_id",
+           "file_name", "mime_type", "file_size", "created_at")
+
+
+def describe_media(message):
+    """(file_unique_id, file_name, mime_type, file_size) of a document/video/audio message"""
+    media = message.document or message.video or message.audio
+    if media is None:
+        return None, None, None, None
+    return (
+        getattr(media, 'file_unique_id', None),
+        getattr(media, 'file_name', None) or getattr(media, 'title', None),
+        getattr(media, 'mime_type', None),
+        getattr(media, 'file_size', None)
+    )
+
+
+class FileIndex:
+    """Local SQLite index of everything stored in the storage channel.
+
+    ``record`` only queues the row; a writer thread inserts queued rows in
+    one transaction once ``flush_size`` rows are waiting or ``flush_interval``
+    seconds have passed. Lookups also see rows that are still queued.
+
+    File names are searchable through ``search``; rows become visible there
+    once they have been written. Results are cached (under their own lock:
+    searches run in worker threads while the writer clears the cache).
+
+    For upload deduplication every ``file_unique_id`` is also kept in memory,
+    mapped to the first storage message holding it. The map is loaded from
+    the database in the background; until then lookups use the indexed
+    column directly.
+    """
+
+    def __init__(self, path: str, flush_size: int = 100, flush_interval: float = 1.0,
+                 search_cache_size: int = 1024):
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.writes = 0
+        self._db = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._writer = None
+        self._unique_ids = {}
+        self._unique_loaded = False
+        self._loader = None
+        self.dedup_hits = 0
+        self.dedup_misses = 0
+        self.search_cache_size = search_cache_size
+        self._search_cache = OrderedDict()
+        self._search_lock = threading.Lock()
+        self._fts = False
+        self.search_hits = 0
+        self.search_misses = 0
+
+    @property
+    def db(self) -> Database:
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    db = Database(self.path)
+                    db.executescript(SCHEMA)
+                    self._fts = self._create_search(db)
+                    self._db = db
+        return self._db
+
+    @staticmethod
+    def _create_search(db) -> bool:
+        """Create and fill the trigram index if missing; False if SQLite can't"""
+        if db.query("SELECT 1 FROM sqlite_master WHERE name = 'files_search'"):
+            return True
+        try:
+            with db.transaction() as conn:
+                for statement in SEARCH_SCHEMA:
+                    conn.execute(statement)
+        except sqlite3.OperationalError as e:
+            logger.warning("File name index unavailable, searching without it: %s", e)
+            return False
+        return True
+
+    def record(self, message_id: int, uploader_id, message, created_at: float = None):
+        """Queue a stored message for indexing"""
+        file_unique_id, file_name, mime_type, file_size = describe_media(message)
+        row = (message_id, encode_file_id(message_id), uploader_id, file_unique_id,
+               file_name, mime_type, file_size, created_at or time.time())
+        with self._lock:
+            self._pending.append(row)
+            if file_unique_id:
+                self._unique_ids.setdefault(file_unique_id, message_id)
+            self._ensure_writer()
+            if len(self._pending) >= self.flush_size:
+                self._wakeup.notify()
+        return row
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name="file-index-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+
+    def _write_loop(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wakeup.wait()
+                if len(self._pending) < self.flush_size:
+                    self._wakeup.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write all queued rows now"""
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return
+        name_position = COLUMNS.index("file_name")
+        try:
+            with self.db.transaction() as conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO files ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    rows
+                )
+                if self._fts:
+                    conn.executemany("DELETE FROM files_search WHERE rowid = ?", [(-row[0],) for row in rows])
+                    conn.executemany(
+                        "INSERT INTO files_search (rowid, file_name) VALUES (?, ?)",
+                        [(-row[0], row[name_position]) for row in rows if row[name_position]]
+                    )
+            with self._search_lock:
+                self.writes += 1
+                self._search_cache.clear()
+        except Exception as e:
+            logger.error("Error writing file index: %s", e)
+            with self._lock:
+                self._pending[:0] = rows
+
+    def _pending_match(self, column: str, value):
+        position = COLUMNS.index(column)
+        with self._lock:
+            for row in reversed(self._pending):
+                if row[position] == value:
+                    return dict(zip(COLUMNS, row))
+        return None
+
+    def _select_one(self, column: str, value):
+        pending = self._pending_match(column, value)
+        if pending is not None:
+            return pending
+        rows = self.db.query(f"SELECT {', '.join(COLUMNS)} FROM files WHERE {column} = ? LIMIT 1", (value,))
+        return dict(zip(COLUMNS, rows[0])) if rows else None
+
+    def load_unique_ids(self):
+        """Start loading the dedup map in a background thread"""
+        if self._loader is None:
+            self._loader = threading.Thread(target=self._load_unique_ids, name="file-index-loader", daemon=True)
+            self._loader.start()
+
+    def _load_unique_ids(self):
+        try:
+            rows = self.db.query(
+                "SELECT file_unique_id, MIN(message_id) FROM files "
+                "WHERE file_unique_id IS NOT NULL GROUP BY file_unique_id"
+            )
+        except Exception as e:
+            logger.error("Error loading file index: %s", e)
+            return
+        with self._lock:
+            for file_unique_id, message_id in rows:
+                # Rows recorded meanwhile are already in the map and win
+                self._unique_ids.setdefault(file_unique_id, message_id)
+            self._unique_loaded = True
+
+    def find_duplicate(self, file_unique_id: str):
+        """Storage message ID already holding this file, or None"""
+        if not file_unique_id:
+            return None
+        message_id = self._unique_ids.get(file_unique_id)
+        if message_id is None and not self._unique_loaded:
+            self.load_unique_ids()
+            row = self.find_by_unique_id(file_unique_id)
+            message_id = row["message_id"] if row else None
+        return self._count_dedup(message_id)
+
+    async def afind_duplicate(self, file_unique_id: str):
+        """``find_duplicate`` for the event loop: a database lookup runs in a worker thread"""
+        if not file_unique_id:
+            return None
+        message_id = self._unique_ids.get(file_unique_id)
+        if message_id is None and not self._unique_loaded:
+            return await asyncio.to_thread(self.find_duplicate, file_unique_id)
+        return self._count_dedup(message_id)
+
+    def _count_dedup(self, message_id):
+        if message_id is None:
+            self.dedup_misses += 1
+        else:
+            self.dedup_hits += 1
+        return message_id
+
+    def dedup_stats(self) -> dict:
+        lookups = self.dedup_hits + self.dedup_misses
+        return {
+            "hits": self.dedup_hits,
+            "misses": self.dedup_misses,
+            "hit_rate": self.dedup_hits / lookups if lookups else 0.0,
+            "unique_files": len(self._unique_ids)
+        }
+
+    def get(self, message_id: int):
+        return self._select_one("message_id", message_id)
+
+    def lookup(self, link_id: str):
+        """Metadata for the file behind a single-file share link ID"""
+        return self._select_one("link_id", link_id)
+
+    def find_by_unique_id(self, file_unique_id: str):
+        return self._select_one("file_unique_id", file_unique_id)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> list:
+        """Newest files whose name contains ``query`` (case-insensitive).
+
+        Queries shorter than three characters can't use the trigram index and
+        return nothing. Results are cached until the next write.
+        """
+        query = " ".join(query.split())
+        if len(query) < MIN_SEARCH_LENGTH:
+            return []
+        key = (query.lower(), limit, offset)
+        with self._search_lock:
+            cached = self._search_cache.get(key)
+            if cached is not None:
+                self._search_cache.move_to_end(key)
+                self.search_hits += 1
+                return cached
+            self.search_misses += 1
+            writes = self.writes
+
+        db = self.db
+        message_ids = self._rare_word_matches(query, limit + offset) if self._fts else None
+        if not self._fts:
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            rows = db.query(
+                f"SELECT {', '.join(COLUMNS)} FROM files WHERE file_name LIKE ? ESCAPE '\\' "
+                "ORDER BY message_id DESC LIMIT ? OFFSET ?",
+                (pattern, limit, offset)
+            )
+        elif message_ids is not None:
+            message_ids = message_ids[offset:offset + limit]
+            rows = db.query(
+                f"SELECT {', '.join(COLUMNS)} FROM files WHERE message_id IN ({', '.join('?' * len(message_ids))}) "
+                "ORDER BY message_id DESC",
+                message_ids
+            ) if message_ids else []
+        else:
+            rows = db.query(
+                f"SELECT {', '.join('f.' + c for c in COLUMNS)} FROM files_search s "
+                "JOIN files f ON f.message_id = -s.rowid "
+                "WHERE files_search MATCH ? ORDER BY s.rowid LIMIT ? OFFSET ?",
+                (_phrase(query), limit, offset)
+            )
+        results = [dict(zip(COLUMNS, row)) for row in rows]
+        with self._search_lock:
+            # Not cached if a write landed meanwhile: the results may be stale
+            if writes == self.writes:
+                self._search_cache[key] = results
+                while len(self._search_cache) > self.search_cache_size:
+                    self._search_cache.popitem(last=False)
+        return results
+
+    def _rare_word_matches(self, query: str, wanted: int):
+        """Message IDs matching ``query``, found through its rarest word.
+
+        Intersecting several long trigram doclists is what makes a query like
+        "lecture 4242" slow, so multi-word queries first look for a word with
+        few matches and filter those names in Python. Returns None when every
+        word is common; the plain phrase query is fast then.
+        """
+        words = [w for w in query.split(" ") if len(w) >= MIN_SEARCH_LENGTH]
+        if len(words) < 2:
+            return None
+        best = None
+        for word in words:
+            rowids = self.db.query(
+                "SELECT rowid FROM files_search WHERE files_search MATCH ? ORDER BY rowid LIMIT ?",
+                (_phrase(word), RARE_WORD_LIMIT + 1)
+            )
+            if len(rowids) <= RARE_WORD_LIMIT and (best is None or len(rowids) < len(best[1])):
+                best = (word, rowids)
+        if best is None:
+            return None
+
+        word, rowids = best
+        needle = query.casefold()
+        message_ids = []
+        for start in range(0, len(rowids), 500):
+            chunk = [r[0] for r in rowids[start:start + 500]]
+            names = self.db.query(
+                f"SELECT rowid, file_name FROM files_search WHERE rowid IN ({', '.join('?' * len(chunk))}) ORDER BY rowid",
+                chunk
+            )
+            message_ids.extend(-rowid for rowid, name in names if needle in name.casefold())
+            if len(message_ids) >= wanted:
+                break
+        return message_ids
+
+    def count(self) -> int:
+        with self._lock:
+            pending = len(self._pending)
+        return self.db.query("SELECT COUNT(*) FROM files")[0][0] + pending
@@ -1,22 +1,151 @@
 from base64 import urlsafe_b64encode, urlsafe_b64decode
 
+# Telegram only accepts start parameters up to 64 characters
+MAX_START_PARAM_LENGTH = 64
+
+# Upper bound on how many messages one deep link may deliver
+MAX_LINK_MESSAGES = 200
+
+# Leading byte of the binary link payloads. Legacy single-file links decode
+# to ASCII digits, so these can never be confused with them.
+_RANGE_MARKER = 0x01
+_LIST_MARKER = 0x02
+
 def encode_file_id(message_id: int) -> str:
     """Encode message ID to safe string"""
     return urlsafe_b64encode(str(message_id).encode()).decode().strip('=')
 
+def _b64decode(encoded_id: str) -> bytes:
+    # Add padding back
+    padding = 4 - (len(encoded_id) % 4)
+    if padding != 4:
+        encoded_id += '=' * padding
+    return urlsafe_b64decode(encoded_id)
+
 def decode_file_id(encoded_id: str) -> int:
     """Decode message ID from encoded string"""
     try:
-        # Add padding back
-        padding = 4 - (len(encoded_id) % 4)
-        if padding != 4:
-            encoded_id += '=' * padding
-            
-        decoded = urlsafe_b64decode(encoded_id).decode()
+        decoded = _b64decode(encoded_id).decode()
         return int(decoded)
     except:
         raise ValueError("Invalid file ID")
 
-def generate_share_link(bot_username: str, message_id: int) -> str:
-    encoded_id = encode_file_id(message_id)
-    return f"https://t.me/{bot_username}?start={encoded_id}"
+def _write_varint(out: bytearray, value: int):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+def _read_varint(data: bytes, pos: int):
+    value = shift = 0
+    while True:
+        if pos >= len(data) or shift > 63:
+            raise ValueError("Truncated link payload")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+def _unzigzag(value: int) -> int:
+    return value // 2 if not value & 1 else -(value + 1) // 2
+
+def _finish(payload: bytearray) -> str:
+    encoded = urlsafe_b64encode(bytes(payload)).decode().rstrip('=')
+    if len(encoded) > MAX_START_PARAM_LENGTH:
+        raise ValueError(f"Link payload is {len(encoded)} characters, Telegram allows {MAX_START_PARAM_LENGTH}")
+    return encoded
+
+def encode_range(first_id: int, last_id: int) -> str:
+    """Encode an inclusive range of message IDs (first..last)"""
+    if first_id < 1 or last_id < first_id:
+        raise ValueError("Invalid message ID range")
+    if last_id - first_id + 1 > MAX_LINK_MESSAGES:
+        raise ValueError(f"A link can hold at most {MAX_LINK_MESSAGES} messages")
+    payload = bytearray([_RANGE_MARKER])
+    _write_varint(payload, first_id)
+    _write_varint(payload, last_id - first_id)
+    return _finish(payload)
+
+def encode_id_list(message_ids) -> str:
+    """Encode an explicit list of message IDs (order is preserved)"""
+    message_ids = list(message_ids)
+    if not message_ids or any(i < 1 for i in message_ids):
+        raise ValueError("Invalid message ID list")
+    if len(message_ids) > MAX_LINK_MESSAGES:
+        raise ValueError(f"A link can hold at most {MAX_LINK_MESSAGES} messages")
+    payload = bytearray([_LIST_MARKER])
+    _write_varint(payload, message_ids[0])
+    for prev, current in zip(message_ids, message_ids[1:]):
+        _write_varint(payload, _zigzag(current - prev))
+    return _finish(payload)
+
+def encode_message_ids(message_ids) -> str:
+    """Pick the most compact encoding for one or more message IDs"""
+    message_ids = list(message_ids)
+    if len(message_ids) == 1:
+        return encode_file_id(message_ids[0])
+    first, last = message_ids[0], message_ids[-1]
+    if message_ids == list(range(first, last + 1)):
+        return encode_range(first, last)
+    return encode_id_list(message_ids)
+
+def decode_message_ids(encoded_id: str) -> list:
+    """Decode a single, range or list deep link into message IDs"""
+    try:
+        data = _b64decode(encoded_id)
+    except Exception:
+        raise ValueError("Invalid file ID")
+    if not data:
+        raise ValueError("Invalid file ID")
+
+    if data[0] == _RANGE_MARKER:
+        first, pos = _read_varint(data, 1)
+        span, pos = _read_varint(data, pos)
+        if pos != len(data) or first < 1 or span + 1 > MAX_LINK_MESSAGES:
+            raise ValueError("Invalid file ID")
+        return list(range(first, first + span + 1))
+
+    if data[0] == _LIST_MARKER:
+        current, pos = _read_varint(data, 1)
+        message_ids = [current]
+        while pos < len(data):
+            delta, pos = _read_varint(data, pos)
+            current += _unzigzag(delta)
+            message_ids.append(current)
+        if len(message_ids) > MAX_LINK_MESSAGES or any(i < 1 for i in message_ids):
+            raise ValueError("Invalid file ID")
+        return message_ids
+
+    return [decode_file_id(encoded_id)]
+
+# Pre-rendered "https://t.me/<bot>?start=" prefix, set once the bot identity is known
+_share_link_prefix = None
+
+def set_bot_username(bot_username: str):
+    """Pre-render the share link prefix for the running bot"""
+    global _share_link_prefix
+    _share_link_prefix = f"https://t.me/{bot_username}?start="
+
+def _build_link(start_param: str, bot_username: str = None) -> str:
+    if bot_username:
+        return f"https://t.me/{bot_username}?start={start_param}"
+    if _share_link_prefix is None:
+        raise RuntimeError("Bot username is not known yet")
+    return _share_link_prefix + start_param
+
+def generate_share_link(message_id: int, bot_username: str = None) -> str:
+    """Build the deep link for a stored message"""
+    return _build_link(encode_file_id(message_id), bot_username)
+
+def generate_batch_link(message_ids, bot_username: str = None) -> str:
+    """Build one deep link that delivers several stored messages"""
+    return _build_link(encode_message_ids(message_ids), bot_username)
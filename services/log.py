@@ -0,0 +1,142 @@
+import atexit
+import functools
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+from services.metrics import handler_latency, handler_errors
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# LOG_LEVEL=DEBUG turns on per-request lines; LOG_DEBUG_SAMPLE keeps only
+# that fraction of them so a busy worker can run with DEBUG enabled
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE", "1.0"))
+
+_secrets = set()
+_listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def fields(**values) -> dict:
+    """``extra`` for a log call: rendered as key=value after the message"""
+    return {"fields": values}
+
+
+def add_secret(value):
+    """Never let this value reach the log output"""
+    if value and len(str(value)) >= 4:
+        _secrets.add(str(value))
+
+
+def redact(text: str) -> str:
+    for secret in _secrets:
+        if secret in text:
+            text = text.replace(secret, "***")
+    return text
+
+
+class SampleFilter(logging.Filter):
+    """Keeps only ``rate`` of the DEBUG records; other levels always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+
+class StructuredFormatter(logging.Formatter):
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        record_fields = getattr(record, "fields", None)
+        if record_fields:
+            line += " " + " ".join(f"{k}={_quote(v)}" for k, v in record_fields.items())
+        return line
+
+    def format(self, record):
+        # Last step, so tracebacks and fields are covered too
+        return redact(super().format(record))
+
+
+def _quote(value):
+    text = str(value)
+    return f'"{text}"' if not text or " " in text or "=" in text else text
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The queue is the only handler, so the record can be passed on as is
+        # and rendered by the listener instead of on the calling thread
+        return record
+
+
+def setup_logging(level: str = None, sample_rate: float = None, stream=None):
+    """Send all logging through a queue to a background writer thread.
+
+    Log calls on the event loop only filter and enqueue the record;
+    formatting, redaction and stdout I/O happen on the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(SampleFilter(DEBUG_SAMPLE_RATE if sample_rate is None else sample_rate))
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(StructuredFormatter(LOG_FORMAT))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level or LOG_LEVEL)
+    # Pyrogram is chatty at INFO; keep its warnings
+    logging.getLogger("pyrogram").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def _update_user_id(update):
+    user = getattr(update, "from_user", None)
+    return user.id if user is not None else None
+
+
+def timed(func):
+    """Record how long an async handler took.
+
+    Every call lands in the handler latency histogram (and the error counter
+    if it raised); at DEBUG it is also logged with the handler name and user ID.
+    """
+    logger = get_logger(func.__module__)
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(client, update, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(client, update, *args, **kwargs)
+        except BaseException:
+            handler_errors.inc(name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            handler_latency.observe(elapsed, name)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Handled update", extra=fields(
+                    handler=name, user_id=_update_user_id(update),
+                    latency_ms=round(elapsed * 1000, 2)
+                ))
+
+    return wrapper
@@ -0,0 +1,96 @@
+import os
+
+from pyrogram.errors import BadRequest
+
+from services.log import get_logger
+from services.single_flight import single_flight
+
+logger = get_logger(__name__)
+
+
+class MediaRefCache:
+    """Telegram file_id for a local media file, uploaded once and reused.
+
+    The file_id is stored in the config next to the file path (under
+    ``file_id_key``) so it survives restarts. Sends use the file_id when one
+    is known and only upload from disk when it is missing or Telegram rejects
+    it; concurrent sends that all need the upload share one. Whether the
+    local file exists is checked once and remembered until ``invalidate`` is
+    called. With no usable file_id and no local file the caption is sent as
+    plain text.
+    """
+
+    def __init__(self, store, path_key: str, file_id_key: str):
+        self.store = store
+        self.path_key = path_key
+        self.file_id_key = file_id_key
+        self.uploads = 0
+        self._exists = None
+
+    @property
+    def path(self) -> str:
+        return self.store.get_str(self.path_key)
+
+    @property
+    def file_id(self):
+        return self.store.get(self.file_id_key)
+
+    def exists(self) -> bool:
+        """Whether there is anything to send, without touching disk on the hot path"""
+        if self.file_id:
+            return True
+        path = self.path
+        if self._exists is None or self._exists[0] != path:
+            self._exists = (path, bool(path) and os.path.exists(path))
+        return self._exists[1]
+
+    def invalidate(self):
+        """Forget the cached stat (call after the file on disk changes)"""
+        self._exists = None
+
+    def remember(self, file_id):
+        if file_id == self.file_id:
+            return
+        config = dict(self.store.snapshot())
+        config[self.file_id_key] = file_id
+        self.store.save(config)
+
+    async def send_photo(self, client, chat_id, **kwargs):
+        """Send the photo by file_id, uploading it from disk only if needed"""
+        file_id = self.file_id
+        if file_id:
+            try:
+                return await client.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+            except BadRequest as e:
+                # Expired or invalid reference - fall back to a fresh upload
+                logger.info("Cached media reference rejected (%s), uploading again", e)
+                if self.file_id == file_id:
+                    self.remember(None)
+                self.invalidate()
+
+        if not self.exists():
+            return await self._send_text(client, chat_id, **kwargs)
+
+        # Only one of the concurrent senders uploads; the rest reuse its file_id
+        token = object()
+        sent, uploader = await single_flight.do(
+            ("media_upload", id(self), self.path), self._upload, client, chat_id, token, kwargs
+        )
+        if uploader is token:
+            return sent
+        file_id = self.file_id
+        if file_id:
+            return await client.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+        return await self._send_text(client, chat_id, **kwargs)
+
+    async def _upload(self, client, chat_id, token, kwargs):
+        sent = await client.send_photo(chat_id=chat_id, photo=self.path, **kwargs)
+        self.uploads += 1
+        if sent and getattr(sent, 'photo', None):
+            self.remember(sent.photo.file_id)
+        return sent, token
+
+    async def _send_text(self, client, chat_id, caption=None, reply_markup=None, **kwargs):
+        if not caption:
+            return None
+        return await client.send_message(chat_id=chat_id, text=caption, reply_markup=reply_markup)
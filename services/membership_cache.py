@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class MembershipCache:
+    """Bounded LRU cache of force-subscribe membership check results.
+
+    Members and non-members are kept in separate tables with their own TTL
+    and size limit: a positive result can be trusted for minutes, while a
+    negative one must expire quickly so a user who just joined is let in.
+    """
+
+    def __init__(self, positive_ttl: float = 300, negative_ttl: float = 10,
+                 max_positive: int = 50000, max_negative: int = 20000):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_positive = max_positive
+        self.max_negative = max_negative
+        self._positive = OrderedDict()
+        self._negative = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, table, key, now):
+        expires_at = table.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del table[key]
+            return False
+        table.move_to_end(key)
+        return True
+
+    def get(self, chat_id, user_id) -> Optional[bool]:
+        """Cached membership for user_id, or None if unknown/expired"""
+        key = (chat_id, user_id)
+        now = time.monotonic()
+        if self._lookup(self._positive, key, now):
+            self.hits += 1
+            return True
+        if self._lookup(self._negative, key, now):
+            self.hits += 1
+            return False
+        self.misses += 1
+        return None
+
+    def set(self, chat_id, user_id, is_member: bool):
+        key = (chat_id, user_id)
+        if is_member:
+            table, other, ttl, limit = self._positive, self._negative, self.positive_ttl, self.max_positive
+        else:
+            table, other, ttl, limit = self._negative, self._positive, self.negative_ttl, self.max_negative
+
+        other.pop(key, None)
+        table[key] = time.monotonic() + ttl
+        table.move_to_end(key)
+        while len(table) > limit:
+            table.popitem(last=False)
+
+    def invalidate(self, chat_id, user_id):
+        key = (chat_id, user_id)
+        self._positive.pop(key, None)
+        self._negative.pop(key, None)
+
+    def clear(self):
+        self._positive.clear()
+        self._negative.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "positive_entries": len(self._positive),
+            "negative_entries": len(self._negative)
+        }
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from services.config_store import write_atomic
+from services.log import get_logger, fields
+
+logger = get_logger(__name__)
+
+MEMBER_STATUSES = {
+    "member", "administrator", "creator", "owner",
+    "ChatMemberStatus.MEMBER", "ChatMemberStatus.ADMINISTRATOR", "ChatMemberStatus.OWNER"
+}
+
+ADMIN_STATUSES = {
+    "administrator", "creator", "owner",
+    "ChatMemberStatus.ADMINISTRATOR", "ChatMemberStatus.OWNER"
+}
+
+
+def is_member_status(status) -> bool:
+    return str(status) in MEMBER_STATUSES
+
+
+def is_admin_status(status) -> bool:
+    return str(status) in ADMIN_STATUSES
+
+
+class MembershipMirror:
+    """Force-subscribe channel membership kept up to date from chat member updates.
+
+    While the bot is an admin of the channel Telegram pushes every join and
+    leave, so ``get`` can answer from memory without an API call. Users the
+    mirror has never seen return None and are checked live; the result is
+    fed back with ``observe``. The mirror only answers once ``activate`` has
+    confirmed the bot can see member updates for the channel, and only for
+    that channel. Non-members are kept least recently seen first and capped
+    at ``max_non_members``; members are bounded by the channel itself.
+
+    Members are snapshotted to ``path`` (atomic JSON write) and reloaded on
+    start if the snapshot is younger than ``max_snapshot_age``; joins and
+    leaves while the bot was down are missed, so an older one is dropped.
+    """
+
+    def __init__(self, path: str, max_snapshot_age: float = 3600, snapshot_interval: float = 60,
+                 max_non_members: int = 100_000):
+        self.path = path
+        self.max_snapshot_age = max_snapshot_age
+        self.snapshot_interval = snapshot_interval
+        self.max_non_members = max_non_members
+        self.chat_id = None
+        self.active = False
+        self._members = set()
+        self._non_members = OrderedDict()
+        self._dirty = False
+        self.events = 0
+        self.hits = 0
+        self.misses = 0
+        self.audited = 0
+        self.audit_mismatches = 0
+
+    def load(self) -> int:
+        """Read the last snapshot; returns how many users it knew"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning("Could not read membership snapshot: %s", e)
+            return 0
+        age = time.time() - snapshot.get("saved_at", 0)
+        if age > self.max_snapshot_age:
+            logger.info("Ignoring stale membership snapshot", extra=fields(age=round(age)))
+            return 0
+        self.chat_id = snapshot.get("chat_id")
+        self._members = set(snapshot.get("members", ()))
+        self._non_members = OrderedDict.fromkeys(snapshot.get("non_members", ()))
+        for user_id in self._members.intersection(self._non_members):
+            del self._non_members[user_id]
+        self._trim()
+        return len(self._members) + len(self._non_members)
+
+    def activate(self, chat_id: int):
+        """Start answering for chat_id (the bot is an admin there)"""
+        if self.chat_id is not None and self.chat_id != chat_id:
+            self._members.clear()
+            self._non_members.clear()
+        self.chat_id = chat_id
+        self.active = True
+
+    def deactivate(self):
+        self.active = False
+
+    def serves(self, chat_id) -> bool:
+        """True if the mirror is live for chat_id"""
+        return self.active and chat_id is not None and chat_id == self.chat_id
+
+    def get(self, user_id, chat_id) -> Optional[bool]:
+        """Mirrored membership in chat_id, or None if the mirror can't tell"""
+        if not self.serves(chat_id):
+            return None
+        if user_id in self._members:
+            self.hits += 1
+            return True
+        if user_id in self._non_members:
+            self._non_members.move_to_end(user_id)
+            self.hits += 1
+            return False
+        self.misses += 1
+        return None
+
+    def observe(self, user_id, is_member: bool):
+        if is_member:
+            self._members.add(user_id)
+            self._non_members.pop(user_id, None)
+        else:
+            self._non_members[user_id] = None
+            self._non_members.move_to_end(user_id)
+            self._members.discard(user_id)
+            self._trim()
+        self._dirty = True
+
+    def _trim(self):
+        while len(self._non_members) > self.max_non_members:
+            self._non_members.popitem(last=False)
+
+    async def on_update(self, client, update):
+        """ChatMemberUpdated handler"""
+        if self.chat_id is None or update.chat is None or update.chat.id != self.chat_id:
+            return
+        member = update.new_chat_member or update.old_chat_member
+        if member is None or member.user is None:
+            return
+        is_member = update.new_chat_member is not None and is_member_status(update.new_chat_member.status)
+        self.observe(member.user.id, is_member)
+        self.events += 1
+
+    def _copy(self) -> tuple:
+        """(chat_id, members, non_members) as plain lists, cheap enough for the loop"""
+        return self.chat_id, list(self._members), list(self._non_members)
+
+    def _write(self, chat_id, members, non_members):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = json.dumps({
+            "chat_id": chat_id,
+            "saved_at": time.time(),
+            "members": members,
+            "non_members": non_members
+        }, separators=(",", ":"))
+        write_atomic(self.path, data)
+
+    def snapshot(self):
+        """Write the mirror to disk now"""
+        if self.chat_id is None:
+            return
+        state = self._copy()
+        self._dirty = False
+        self._write(*state)
+
+    async def run(self):
+        """Background task snapshotting the mirror whenever it changed"""
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            if not self._dirty or self.chat_id is None:
+                continue
+            try:
+                # Copy on the loop (the sets change there); encode and write off it
+                state = self._copy()
+                self._dirty = False
+                await asyncio.to_thread(self._write, *state)
+            except Exception as e:
+                self._dirty = True
+                logger.warning("Could not write membership snapshot: %s", e)
+
+    async def audit(self, check, sample: int = 50) -> dict:
+        """Compare a random sample of mirrored users against live checks.
+
+        ``check(user_id)`` must return the live membership. Mismatches are
+        corrected in the mirror and counted; the share of mismatches is the
+        mirror's staleness.
+        """
+        known = [(user_id, True) for user_id in self._members]
+        known += [(user_id, False) for user_id in self._non_members]
+        checked = mismatched = 0
+        for user_id, mirrored in random.sample(known, min(sample, len(known))):
+            try:
+                live = await check(user_id)
+            except Exception as e:
+                logger.debug("Audit check failed: %s", e, extra=fields(user_id=user_id))
+                continue
+            checked += 1
+            if live != mirrored:
+                mismatched += 1
+                self.observe(user_id, live)
+        self.audited += checked
+        self.audit_mismatches += mismatched
+        result = {"checked": checked, "mismatched": mismatched,
+                  "staleness": mismatched / checked if checked else 0.0}
+        logger.info("Membership mirror audit", extra=fields(**result))
+        return result
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "active": self.active,
+            "members": len(self._members),
+            "non_members": len(self._non_members),
+            "events": self.events,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "audited": self.audited,
+            "audit_mismatches": self.audit_mismatches
+        }
@@ -0,0 +1,210 @@
+import asyncio
+import bisect
+import logging
+import math
+import threading
+
+# Plain logging here: services.log imports this module for handler timing
+logger = logging.getLogger(__name__)
+
+# Seconds; covers cached handlers (sub-millisecond) up to slow uploads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    __slots__ = ("name", "help", "labelnames", "_values", "_lock")
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram; ``observe`` is a bisect and three adds"""
+
+    __slots__ = ("name", "help", "labelnames", "buckets", "_series", "_lock")
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items()]
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = _labels(self.labelnames, labels, [("le", _number(float(bound)))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Collector:
+    """Values read from an existing ``stats()`` dict when scraped.
+
+    ``func`` returns ``{(label values...): value}``; ``kind`` is the exposed
+    metric type ("gauge" or "counter").
+    """
+
+    __slots__ = ("name", "help", "labelnames", "func", "kind")
+
+    def __init__(self, name: str, help: str, labelnames, func, kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.func = func
+        self.kind = kind
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self.func()
+        except Exception as e:
+            logger.warning("Metrics collector %s failed: %s", self.name, e)
+            return []
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self._metrics.get(name) or self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.get(name) or self.register(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, name: str, help: str, labelnames, func, kind: str = "gauge") -> Collector:
+        return self.register(Collector(name, help, labelnames, func, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+handler_latency = registry.histogram(
+    "bot_handler_latency_seconds", "Time spent handling one update", ("handler",)
+)
+handler_errors = registry.counter(
+    "bot_handler_errors_total", "Updates whose handler raised", ("handler",)
+)
+api_latency = registry.histogram(
+    "telegram_api_latency_seconds", "Telegram API call time, excluding rate-limiter waits", ("method",)
+)
+api_errors = registry.counter(
+    "telegram_api_errors_total", "Failed Telegram API calls", ("method", "error")
+)
+api_flood_waits = registry.counter(
+    "telegram_api_flood_waits_total", "FloodWait answers from Telegram", ("method",)
+)
+
+
+def stats_collector(name: str, help: str, stats, keys, kind: str = "counter"):
+    """Expose some numeric keys of a ``stats()`` dict as one labelled metric"""
+    return registry.collector(
+        name, help, ("kind",),
+        lambda: {(key,): stats()[key] for key in keys}, kind
+    )
+
+
+async def _handle_request(reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        # Drain headers; the body (if any) is ignored
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/metrics", "/"):
+            # Some collectors read SQLite; keep that off the event loop
+            status, body = "200 OK", (await asyncio.to_thread(registry.render)).encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.debug("Metrics request failed: %s", e)
+    finally:
+        writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 9100):
+    """Serve the text exposition format at http://host:port/metrics"""
+    server = await asyncio.start_server(_handle_request, host, port)
+    logger.info("Metrics listening on http://%s:%s/metrics", host, port)
+    return server
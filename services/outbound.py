@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from pyrogram import Client
+from pyrogram.errors import Flood, FloodWait, InternalServerError, ServiceUnavailable, SlowmodeWait
+
+from services.rate_limiter import OutboundScheduler
+from services.metrics import api_latency, api_errors, api_flood_waits
+
+# Raw functions that post into a chat and count against per-chat limits
+SEND_METHODS = {
+    "SendMessage", "SendMedia", "SendMultiMedia", "ForwardMessages",
+    "EditMessage", "SendReaction", "DeleteMessages", "SetTyping"
+}
+
+
+def flood_wait_seconds(error):
+    if isinstance(error, (FloodWait, SlowmodeWait)):
+        return float(error.value)
+    return None
+
+
+def is_retryable(error) -> bool:
+    """True for errors that may pass on a later attempt: flood limits,
+    Telegram-side 5xx errors and network timeouts. Bad requests (deleted or
+    invalid messages) and Forbidden (the user blocked the bot) are final.
+    """
+    return isinstance(error, (Flood, InternalServerError, ServiceUnavailable, OSError, asyncio.TimeoutError))
+
+
+def peer_chat_id(peer):
+    """Bot API style chat ID of a raw input peer, or None"""
+    if peer is None:
+        return None
+    user_id = getattr(peer, "user_id", None)
+    if user_id is not None:
+        return user_id
+    channel_id = getattr(peer, "channel_id", None)
+    if channel_id is not None:
+        return int(f"-100{channel_id}")
+    chat_id = getattr(peer, "chat_id", None)
+    if chat_id is not None:
+        return -chat_id
+    return None
+
+
+outbound = OutboundScheduler(flood_wait_of=flood_wait_seconds)
+
+
+class ThrottledClient(Client):
+    """Client whose every API call goes through the shared outbound scheduler.
+
+    All high-level methods (send_message, message.reply, callback answers,
+    get_chat_member, ...) end up in ``invoke``, so throttling there covers
+    every call the handlers make. Pyrogram's own FloodWait sleeping is turned
+    off so the scheduler can park only the affected chat or method.
+    """
+
+    def __init__(self, *args, scheduler: OutboundScheduler = None, **kwargs):
+        kwargs.setdefault("sleep_threshold", 0)
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler or outbound
+
+    async def invoke(self, query, *args, **kwargs):
+        method = type(query).__name__
+        peer = (getattr(query, "peer", None) or getattr(query, "to_peer", None)
+                or getattr(query, "channel", None))
+        return await self.scheduler.call(
+            method, peer_chat_id(peer), method in SEND_METHODS,
+            lambda: self._timed_invoke(method, query, *args, **kwargs)
+        )
+
+    async def _timed_invoke(self, method, query, *args, **kwargs):
+        # Only the API round-trip; time spent waiting on the limiter is excluded
+        start = time.perf_counter()
+        try:
+            return await Client.invoke(self, query, *args, **kwargs)
+        except Exception as e:
+            if flood_wait_seconds(e) is not None:
+                api_flood_waits.inc(method)
+            else:
+                api_errors.inc(method, type(e).__name__)
+            raise
+        finally:
+            api_latency.observe(time.perf_counter() - start, method)
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import random
+import time
+
+from services.db import Database
+from services.log import get_logger, fields
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    message_ids TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt_at);
+"""
+
+
+class Outbox:
+    """Durable queue of file deliveries that failed and must be retried.
+
+    Rows live in SQLite (WAL mode), so queued deliveries survive restarts.
+    ``run`` drains due rows through ``deliver(chat_id, message_ids)``, which
+    returns ``(remaining_ids, error)``. Failed rows are rescheduled with
+    exponential backoff, or after the FloodWait duration if that is longer,
+    and dropped after ``max_attempts`` or as soon as ``retryable(error)`` is
+    False.
+    """
+
+    def __init__(self, path: str, deliver, base_delay: float = 5, max_delay: float = 900,
+                 max_attempts: int = 10, poll_interval: float = 2, batch_size: int = 20,
+                 flood_wait_of=None, retryable=None):
+        self.path = path
+        self.deliver = deliver
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.flood_wait_of = flood_wait_of or (lambda e: None)
+        self.retryable = retryable or (lambda e: True)
+        self.delivered = 0
+        self.dropped = 0
+        self._db = None
+        self._wakeup = None
+
+    def _open(self):
+        if self._db is None:
+            self._db = Database(self.path)
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def _retry_delay(self, attempts: int, error) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        delay *= random.uniform(0.8, 1.2)
+        flood_wait = self.flood_wait_of(error) if error is not None else None
+        if flood_wait is not None:
+            delay = max(delay, flood_wait + 1)
+        return delay
+
+    def _insert(self, chat_id, message_ids, error):
+        now = time.time()
+        attempts = 1
+        cur = self._open().execute(
+            "INSERT INTO outbox (chat_id, message_ids, attempts, next_attempt_at, created_at, last_error) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (chat_id, json.dumps(list(message_ids)), attempts,
+             now + self._retry_delay(attempts, error), now, str(error) if error else None)
+        )
+        return cur.lastrowid
+
+    async def add(self, chat_id, message_ids, error=None) -> int:
+        """Queue message_ids for delivery to chat_id"""
+        row_id = await asyncio.to_thread(self._insert, chat_id, message_ids, error)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return row_id
+
+    def _due(self):
+        return self._open().query(
+            "SELECT id, chat_id, message_ids, attempts FROM outbox "
+            "WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+            (time.time(), self.batch_size)
+        )
+
+    def _next_due_in(self):
+        rows = self._open().query("SELECT MIN(next_attempt_at) FROM outbox")
+        if not rows or rows[0][0] is None:
+            return None
+        return max(0.0, rows[0][0] - time.time())
+
+    def _finish(self, row_id):
+        self._open().execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+
+    def _reschedule(self, row_id, remaining, attempts, error):
+        self._open().execute(
+            "UPDATE outbox SET message_ids = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (json.dumps(remaining), attempts, time.time() + self._retry_delay(attempts, error),
+             str(error) if error else None, row_id)
+        )
+
+    def pending(self) -> int:
+        return self._open().query("SELECT COUNT(*) FROM outbox")[0][0]
+
+    async def process_due(self) -> int:
+        """Attempt every due delivery once; returns how many rows were handled"""
+        rows = await asyncio.to_thread(self._due)
+        for row_id, chat_id, message_ids, attempts in rows:
+            message_ids = json.loads(message_ids)
+            try:
+                remaining, error = await self.deliver(chat_id, message_ids)
+            except Exception as e:
+                remaining, error = message_ids, e
+
+            if not remaining:
+                self.delivered += 1
+                await asyncio.to_thread(self._finish, row_id)
+            elif attempts + 1 > self.max_attempts or not self.retryable(error):
+                self.dropped += 1
+                logger.warning("Giving up on delivery: %s", error,
+                               extra=fields(delivery_id=row_id, chat_id=chat_id, attempts=attempts))
+                await asyncio.to_thread(self._finish, row_id)
+            else:
+                await asyncio.to_thread(self._reschedule, row_id, remaining, attempts + 1, error)
+        return len(rows)
+
+    async def run(self):
+        """Background worker draining the outbox until cancelled"""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                handled = await self.process_due()
+                if handled:
+                    continue
+                next_due = await asyncio.to_thread(self._next_due_in)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Outbox worker error")
+                next_due = None
+
+            timeout = self.poll_interval if next_due is None else min(next_due, self.poll_interval * 15)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0.1))
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,93 @@
+from pyrogram import raw, utils
+
+from services.log import get_logger, fields
+
+logger = get_logger(__name__)
+
+
+def _chat_ref(channel):
+    """Config value ("@name", "name", "-100123" or an int) as resolve_peer expects it"""
+    value = str(channel).strip()
+    if value.lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+def describe_peer(peer) -> dict:
+    """Numeric ID, access hash and Pyrogram storage type of an input peer"""
+    if isinstance(peer, raw.types.InputPeerChannel):
+        return {"id": utils.get_channel_id(peer.channel_id), "access_hash": peer.access_hash, "type": "channel"}
+    if isinstance(peer, raw.types.InputPeerChat):
+        return {"id": -peer.chat_id, "access_hash": 0, "type": "group"}
+    if isinstance(peer, raw.types.InputPeerUser):
+        return {"id": peer.user_id, "access_hash": peer.access_hash, "type": "user"}
+    raise ValueError(f"Unsupported peer: {type(peer).__name__}")
+
+
+class PeerRefCache:
+    """Numeric peer for a chat configured by username, resolved once and reused.
+
+    Pyrogram resolves a username with contacts.ResolveUsername (one of the
+    most strictly rate limited methods) whenever its cached entry is older
+    than 8 hours. The numeric ID and access hash are resolved once instead,
+    stored in the config next to the username (under ``peer_key``) and put
+    back into Pyrogram's peer storage by ``seed`` on start, so API calls made
+    with ``target`` never need a lookup. The stored peer is ignored once the
+    configured chat changes.
+    """
+
+    def __init__(self, store, chat_key: str, peer_key: str):
+        self.store = store
+        self.chat_key = chat_key
+        self.peer_key = peer_key
+        self.resolutions = 0
+
+    def _current(self):
+        config = self.store.snapshot()
+        chat = config.get(self.chat_key)
+        peer = config.get(self.peer_key)
+        if chat and peer and peer.get("chat") == str(chat):
+            return chat, peer
+        return chat, None
+
+    @property
+    def chat(self):
+        return self._current()[0]
+
+    @property
+    def chat_id(self):
+        """Resolved numeric ID, or None until ``resolve`` has run"""
+        peer = self._current()[1]
+        return peer["id"] if peer else None
+
+    @property
+    def target(self):
+        """What to pass as chat_id in API calls: the numeric ID once known"""
+        chat, peer = self._current()
+        return peer["id"] if peer else chat
+
+    async def seed(self, client) -> bool:
+        """Hand the stored peer to Pyrogram so the first call resolves nothing"""
+        peer = self._current()[1]
+        if peer is None:
+            return False
+        # No username: a re-stamped one would look fresh to Pyrogram
+        await client.storage.update_peers([(peer["id"], peer["access_hash"], peer["type"], None, None)])
+        return True
+
+    async def resolve(self, client, force: bool = False):
+        """Numeric ID of the configured chat, resolving and storing it if needed"""
+        chat, peer = self._current()
+        if not chat:
+            return None
+        if peer is not None and not force:
+            return peer["id"]
+
+        self.resolutions += 1
+        peer = describe_peer(await client.resolve_peer(_chat_ref(chat)))
+        peer["chat"] = str(chat)
+        config = dict(self.store.snapshot())
+        config[self.peer_key] = peer
+        self.store.save(config)
+        logger.info("Resolved %s", self.chat_key, extra=fields(chat=chat, chat_id=peer["id"]))
+        return peer["id"]
@@ -0,0 +1,179 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of polling.
+
+    ``reserve`` always takes a token and returns how long the caller has to
+    wait for it, so concurrent callers queue up in arrival order.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def wait_time(self, now: float) -> float:
+        """How long until a token is available, without taking it"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class _ChatSlot:
+    __slots__ = ("bucket", "lock")
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.lock = asyncio.Lock()
+
+
+class OutboundScheduler:
+    """Shared throttle for every outbound Telegram call.
+
+    All calls share one global bucket; calls that send into a chat also take
+    from the global send bucket and from that chat's own bucket (private
+    chats and groups have different limits). Sends to one chat are queued
+    one at a time and charged to the chat bucket at the moment they actually
+    go out, so waiting on the global bucket can't bunch them together.
+    ``set_chat_limit`` gives one chat its own rate instead. A FloodWait parks only what it
+    was about: the target chat for sends, the method otherwise. Parked calls
+    wait it out, and the failed call is retried once if the wait is at most
+    ``max_flood_wait`` seconds.
+    """
+
+    def __init__(self, global_rate: float = 100, send_rate: float = 30,
+                 private_rate: float = 1, private_burst: float = 3,
+                 group_rate: float = 20 / 60, group_burst: float = 3,
+                 max_chats: int = 10000, max_flood_wait: float = 60,
+                 flood_wait_of=None):
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_chats = max_chats
+        self.max_flood_wait = max_flood_wait
+        self.flood_wait_of = flood_wait_of or (lambda e: None)
+        self._global = TokenBucket(global_rate, global_rate)
+        self._send = TokenBucket(send_rate, send_rate)
+        self._chats = OrderedDict()
+        self._chat_limits = {}
+        self._parked = {}
+        self.calls = 0
+        self.throttled = 0
+        self.flood_waits = 0
+
+    def _chat_slot(self, chat_id):
+        slot = self._chats.get(chat_id)
+        if slot is None:
+            if chat_id in self._chat_limits:
+                slot = _ChatSlot(TokenBucket(*self._chat_limits[chat_id]))
+            elif chat_id > 0:
+                slot = _ChatSlot(TokenBucket(self.private_rate, self.private_burst))
+            else:
+                slot = _ChatSlot(TokenBucket(self.group_rate, self.group_burst))
+            self._chats[chat_id] = slot
+            while len(self._chats) > self.max_chats:
+                oldest_id, oldest = next(iter(self._chats.items()))
+                if oldest.lock.locked():
+                    break
+                del self._chats[oldest_id]
+        else:
+            self._chats.move_to_end(chat_id)
+        return slot
+
+    def set_chat_limit(self, chat_id, rate: float, burst: float):
+        """Send limit for one chat, replacing the private/group default"""
+        self._chat_limits[chat_id] = (rate, burst)
+        self._chats.pop(chat_id, None)
+
+    def park(self, key, seconds: float):
+        now = time.monotonic()
+        if len(self._parked) > 1000:
+            self._parked = {k: u for k, u in self._parked.items() if u > now}
+        until = now + seconds
+        if until > self._parked.get(key, 0):
+            self._parked[key] = until
+
+    def _park_key(self, method, chat_id, send):
+        return ("chat", chat_id) if send and chat_id is not None else ("method", method)
+
+    async def _wait_parked(self, method, chat_id, send):
+        while True:
+            now = time.monotonic()
+            until = max(self._parked.get(("method", method), 0),
+                        self._parked.get(("chat", chat_id), 0) if send else 0)
+            if until <= now:
+                return
+            await asyncio.sleep(until - now)
+
+    async def _take_global(self, send: bool) -> bool:
+        now = time.monotonic()
+        wait = self._global.reserve(now)
+        if send:
+            wait = max(wait, self._send.reserve(now))
+        if wait > 0:
+            await asyncio.sleep(wait)
+            return True
+        return False
+
+    async def acquire(self, method: str, chat_id=None, send: bool = False):
+        await self._wait_parked(method, chat_id, send)
+        self.calls += 1
+        if not send or chat_id is None:
+            if await self._take_global(send):
+                self.throttled += 1
+            return
+
+        slot = self._chat_slot(chat_id)
+        async with slot.lock:
+            throttled = False
+            wait = slot.bucket.wait_time(time.monotonic())
+            if wait > 0:
+                throttled = True
+                await asyncio.sleep(wait)
+            if await self._take_global(send):
+                throttled = True
+            slot.bucket.reserve(time.monotonic())
+            if throttled:
+                self.throttled += 1
+
+    async def call(self, method: str, chat_id, send: bool, func):
+        """Run func() under the limits, handling FloodWait for it"""
+        await self.acquire(method, chat_id, send)
+        try:
+            return await func()
+        except Exception as e:
+            seconds = self.flood_wait_of(e)
+            if seconds is None:
+                raise
+            self.flood_waits += 1
+            self.park(self._park_key(method, chat_id, send), seconds)
+            if seconds > self.max_flood_wait:
+                raise
+
+        await self.acquire(method, chat_id, send)
+        return await func()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "flood_waits": self.flood_waits,
+            "parked": sum(1 for until in self._parked.values() if until > now),
+            "chats": len(self._chats)
+        }
@@ -0,0 +1,45 @@
+import asyncio
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one shared in-flight task.
+
+    While a call for a key is running, every other caller with the same key
+    awaits the same task and gets the same result (or exception). The key is
+    forgotten as soon as the call finishes, so nothing is cached beyond the
+    lifetime of the request.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, func, *args, **kwargs):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.calls += 1
+        else:
+            self.shared += 1
+        # Shield so one caller being cancelled doesn't cancel everyone else
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared, "inflight": len(self._inflight)}
+
+
+single_flight = SingleFlight()
+
+async def coalesced(client, method: str, *args):
+    """Call client.<method>(*args), sharing the result with identical concurrent calls"""
+    return await single_flight.do((id(client), method, args), getattr(client, method), *args)
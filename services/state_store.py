@@ -0,0 +1,342 @@
+import asyncio
+import atexit
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+
+from services.db import Database
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS state_expiry ON state (expires_at);
+"""
+
+
+class _Entry:
+    __slots__ = ("value", "expires")
+
+    def __init__(self, value, expires: float):
+        self.value = value
+        self.expires = expires
+
+
+class TTLStore:
+    """Bounded per-user state with expiry, usable like a small dict.
+
+    Entries expire ``ttl`` seconds after they were set and are dropped
+    lazily on access plus a few at a time from the cold end on every write.
+    Past ``max_size`` the least recently used entry is evicted, so memory
+    stays flat however many users come and go.
+    """
+
+    def __init__(self, ttl: float, max_size: int, sweep_batch: int = 8):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sweep_batch = sweep_batch
+        self._data = OrderedDict()
+        self.expired = 0
+        self.evicted = 0
+
+    def __setitem__(self, key, value):
+        self._insert(key, value, time.monotonic() + self.ttl)
+
+    def _insert(self, key, value, expires: float):
+        now = time.monotonic()
+        data = self._data
+        data[key] = _Entry(value, expires)
+        data.move_to_end(key)
+        self._sweep(now)
+        while len(data) > self.max_size:
+            data.popitem(last=False)
+            self.evicted += 1
+
+    def _sweep(self, now: float):
+        data = self._data
+        for _ in range(self.sweep_batch):
+            if not data:
+                return
+            key, entry = next(iter(data.items()))
+            if entry.expires > now:
+                return
+            del data[key]
+            self.expired += 1
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            del self._data[key]
+            self.expired += 1
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def __getitem__(self, key):
+        entry = self._live(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry.value
+
+    def get(self, key, default=None):
+        entry = self._live(key)
+        return default if entry is None else entry.value
+
+    def __contains__(self, key) -> bool:
+        return self._live(key) is not None
+
+    _missing = object()
+
+    def pop(self, key, default=_missing):
+        entry = self._data.pop(key, None)
+        if entry is None or entry.expires <= time.monotonic():
+            if default is self._missing:
+                raise KeyError(key)
+            return default
+        return entry.value
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+
+    def purge(self) -> int:
+        """Drop every expired entry now; returns how many were removed"""
+        now = time.monotonic()
+        stale = [key for key, entry in self._data.items() if entry.expires <= now]
+        for key in stale:
+            del self._data[key]
+        self.expired += len(stale)
+        return len(stale)
+
+    def memory_bytes(self, sample: int = 64) -> int:
+        """Approximate footprint: table plus per-entry key/value sizes (sampled)
+
+        Safe to call from a worker thread: the sample is copied in one C-level
+        step, so the event loop changing the dict meanwhile can't break it.
+        """
+        data = self._data
+        entries = list(islice(data.items(), sample))
+        total = sys.getsizeof(data)
+        if not entries:
+            return total
+        per_entry = sum(sys.getsizeof(key) + sys.getsizeof(entry) + sys.getsizeof(entry.value)
+                        for key, entry in entries)
+        return total + per_entry * len(data) // len(entries)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "max_size": self.max_size,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "memory_bytes": self.memory_bytes()
+        }
+
+
+class PersistentTTLStore(TTLStore):
+    """TTLStore backed by SQLite, so entries survive restarts.
+
+    Memory holds the recently used entries as before; the database holds
+    all of them. A key missing from memory is looked up on disk the first
+    time it is asked for (a primary key read), so nothing is loaded up front.
+    ``get``, ``pop`` and ``in`` may do that read inline; on the event loop
+    use ``aget`` and ``apop``, which do it in a worker thread.
+    Writes and deletes only mark the key dirty; a writer thread commits dirty
+    keys in one transaction after ``flush_interval`` seconds or once
+    ``flush_size`` are waiting, and every ``sweep_interval`` seconds deletes
+    all expired rows with a single statement. Values must be JSON-serialisable.
+
+    ``len()`` counts the entries in memory only.
+    """
+
+    def __init__(self, path: str, ttl: float, max_size: int, flush_size: int = 200,
+                 flush_interval: float = 1.0, sweep_interval: float = 600, sweep_batch: int = 8):
+        super().__init__(ttl, max_size, sweep_batch)
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self.writes = 0
+        self.disk_reads = 0
+        self.swept = 0
+        self._db = None
+        # key -> (json value, wall-clock expiry), or None for a delete
+        self._dirty = {}
+        self._flushing = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._writer = None
+        self._next_sweep = 0.0
+
+    @property
+    def db(self) -> Database:
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    db = Database(self.path)
+                    db.executescript(SCHEMA)
+                    self._db = db
+        return self._db
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._mark(key, (json.dumps(value), time.time() + self.ttl))
+
+    def _mark(self, key, change):
+        with self._lock:
+            self._dirty[key] = change
+            self._ensure_writer()
+            if len(self._dirty) == 1 or len(self._dirty) >= self.flush_size:
+                self._wakeup.notify()
+
+    def _live(self, key):
+        entry = super()._live(key)
+        if entry is None:
+            entry = self._load(key)
+        return entry
+
+    def _pending_change(self, key):
+        """Unwritten change for key: (value, expiry), None for a delete, False if none"""
+        with self._lock:
+            if key in self._dirty:
+                return self._dirty[key]
+            if key in self._flushing:
+                return self._flushing[key]
+        return False
+
+    def _read(self, key):
+        self.disk_reads += 1
+        rows = self.db.query("SELECT value, expires_at FROM state WHERE key = ?", (key,))
+        return rows[0] if rows else None
+
+    def _load(self, key):
+        """Bring a key back from pending writes or the database"""
+        change = self._pending_change(key)
+        if change is False:
+            change = self._read(key)
+        return self._restore(key, change)
+
+    async def aget(self, key, default=None):
+        """``get`` without blocking the event loop on a disk read"""
+        entry = super()._live(key)
+        if entry is None:
+            change = self._pending_change(key)
+            if change is False:
+                change = await asyncio.to_thread(self._read, key)
+                # A set or pop made while the row was read wins over it
+                entry = super()._live(key)
+                pending = self._pending_change(key)
+                if pending is not False:
+                    change = pending
+            if entry is None:
+                entry = self._restore(key, change)
+        return default if entry is None else entry.value
+
+    async def apop(self, key, default=None):
+        """``pop`` without blocking the event loop on a disk read"""
+        value = await self.aget(key, self._missing)
+        self._data.pop(key, None)
+        self._mark(key, None)
+        return default if value is self._missing else value
+
+    def _restore(self, key, change):
+        if change is None:
+            return None
+        value, expires_at = change
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            return None
+        self._insert(key, json.loads(value), time.monotonic() + remaining)
+        return self._data[key]
+
+    def pop(self, key, default=TTLStore._missing):
+        entry = self._live(key)
+        if entry is not None:
+            del self._data[key]
+        self._mark(key, None)
+        if entry is None:
+            if default is self._missing:
+                raise KeyError(key)
+            return default
+        return entry.value
+
+    def __delitem__(self, key):
+        self.pop(key)
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._dirty.clear()
+        self.db.execute("DELETE FROM state")
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name="state-store-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+
+    def _write_loop(self):
+        while True:
+            with self._lock:
+                if not self._dirty:
+                    self._wakeup.wait(self.sweep_interval)
+                if self._dirty and len(self._dirty) < self.flush_size:
+                    self._wakeup.wait(self.flush_interval)
+            self.flush()
+            if time.monotonic() >= self._next_sweep:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error("Error sweeping %s: %s", self.path, e)
+
+    def flush(self):
+        """Write all dirty keys now"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            self._flushing = dirty
+        if not dirty:
+            return
+        upserts = [(key, change[0], change[1]) for key, change in dirty.items() if change is not None]
+        deletes = [(key,) for key, change in dirty.items() if change is None]
+        try:
+            with self.db.transaction() as conn:
+                conn.executemany("INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)", upserts)
+                conn.executemany("DELETE FROM state WHERE key = ?", deletes)
+            self.writes += 1
+        except Exception as e:
+            logger.error("Error writing %s: %s", self.path, e)
+            with self._lock:
+                # Newer changes made meanwhile win
+                for key, change in dirty.items():
+                    self._dirty.setdefault(key, change)
+        finally:
+            with self._lock:
+                self._flushing = {}
+
+    def sweep(self) -> int:
+        """Delete every expired row; returns how many were removed"""
+        self._next_sweep = time.monotonic() + self.sweep_interval
+        removed = self.db.execute("DELETE FROM state WHERE expires_at <= ?", (time.time(),)).rowcount
+        self.swept += removed
+        return removed
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update(writes=self.writes, disk_reads=self.disk_reads, swept=self.swept,
+                     dirty=len(self._dirty))
+        return stats
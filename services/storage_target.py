@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+from pyrogram.errors import (
+    ChannelInvalid, ChannelPrivate, ChatAdminRequired, ChatWriteForbidden, PeerIdInvalid
+)
+
+from services.single_flight import single_flight
+from services.log import get_logger, fields
+
+logger = get_logger(__name__)
+
+# Errors from a storage channel call that mean our resolved state is stale
+REFRESH_ERRORS = (PeerIdInvalid, ChannelInvalid, ChannelPrivate, ChatAdminRequired, ChatWriteForbidden)
+
+
+def _can_post(member) -> bool:
+    # Works with different Pyrogram versions
+    if getattr(member, 'privileges', None) is not None:
+        return bool(getattr(member.privileges, 'can_post_messages', False))
+    return bool(getattr(member, 'can_post_messages', False))
+
+
+class StorageTarget:
+    """Storage channel peer and post permission, verified once and pinned.
+
+    The channel is resolved at startup (or on first use) and reused for every
+    upload. It is re-verified in the background every ``refresh_interval``
+    seconds, or immediately after an RPC error that means the cached state is
+    wrong (see ``invalidate``). Failed resolutions, and resolutions showing
+    the bot cannot post, are remembered for ``retry_after`` seconds so a
+    broken channel doesn't cost API calls on every upload.
+    """
+
+    def __init__(self, channel_id, refresh_interval: float = 3600, retry_after: float = 30):
+        self.channel_id = int(channel_id)
+        self.refresh_interval = refresh_interval
+        self.retry_after = retry_after
+        self.chat_id = None
+        self.title = None
+        self.status = None
+        self.can_post = False
+        self.error = None
+        self.resolutions = 0
+        self._checked_at = 0.0
+        self._refreshing = None
+
+    def invalidate(self):
+        self.chat_id = None
+        self.error = None
+        self._checked_at = 0.0
+
+    async def get(self, client) -> int:
+        """Return the pinned storage chat ID, resolving it if needed"""
+        now = time.monotonic()
+        if self.chat_id is None:
+            if self.error is not None and now - self._checked_at < self.retry_after:
+                raise self.error
+            await self.resolve(client)
+        elif not self.can_post and now - self._checked_at > self.retry_after:
+            # Missing post rights are treated like a failed resolution, so
+            # granting them takes effect within retry_after, not an hour
+            await self.resolve(client)
+        elif now - self._checked_at > self.refresh_interval and self._refreshing is None:
+            # Serve the pinned peer while re-verifying in the background
+            self._refreshing = asyncio.ensure_future(self._background_refresh(client))
+
+        if not self.can_post:
+            raise ChatAdminRequired("Bot needs to be an admin in the storage channel with 'Post Messages' permission. Please check your channel settings.")
+        return self.chat_id
+
+    async def resolve(self, client):
+        return await single_flight.do(("storage_target", id(client), self.channel_id), self._resolve, client)
+
+    async def _background_refresh(self, client):
+        try:
+            await self.resolve(client)
+        except Exception as e:
+            logger.warning("Storage channel re-verification failed: %s", e)
+        finally:
+            self._refreshing = None
+
+    async def _resolve(self, client):
+        self.resolutions += 1
+        try:
+            chat = await self._find_chat(client)
+            member = await client.get_chat_member(chat.id, "me")
+        except Exception as e:
+            self.chat_id = None
+            self.error = e
+            self._checked_at = time.monotonic()
+            raise
+
+        self.chat_id = chat.id
+        self.title = chat.title
+        self.status = member.status
+        self.can_post = _can_post(member)
+        self.error = None
+        self._checked_at = time.monotonic()
+        logger.info("Storage channel resolved: %s", self.title, extra=fields(chat_id=self.chat_id, can_post=self.can_post))
+        return self
+
+    async def _find_chat(self, client):
+        try:
+            return await client.get_chat(self.channel_id)
+        except (PeerIdInvalid, ChannelInvalid) as e:
+            # Try alternative channel ID formats if the original doesn't work
+            alternative_ids = [
+                int(str(self.channel_id).replace('-100', '-1001')),  # Try -1001 format
+                int(f"-100{str(abs(self.channel_id))[3:]}"),  # Different -100 format
+                int(str(abs(self.channel_id))[3:])  # Just the numeric part
+            ]
+
+            for alt_id in alternative_ids:
+                try:
+                    logger.debug("Trying alternative channel ID", extra=fields(chat_id=alt_id))
+                    chat = await client.get_chat(alt_id)
+                    if chat:
+                        logger.info("Found channel with alternative ID: %s", chat.title, extra=fields(chat_id=chat.id))
+                        return chat
+                except Exception:
+                    continue
+
+            raise PeerIdInvalid(f"Storage channel not found with any ID format. Original error: {str(e)}")
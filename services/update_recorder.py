@@ -0,0 +1,106 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+from services.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def encode_update(update, now: float = None) -> dict:
+    """Compact, replayable form of a message, callback query or inline query.
+
+    Keys: t time, k kind (m/c/i), u user, c chat, x text, f file
+    [unique_id, name, size, mime], d callback data, q/o inline query/offset.
+    """
+    user = getattr(update, "from_user", None)
+    record = {"t": round(now if now is not None else time.time(), 4),
+              "u": user.id if user is not None else None}
+
+    data = getattr(update, "data", None)
+    if data is not None and hasattr(update, "message"):
+        message = update.message
+        record.update(k="c", c=message.chat.id if message else None,
+                      d=data if isinstance(data, str) else data.decode("utf-8", "replace"))
+        return record
+
+    if hasattr(update, "query") and hasattr(update, "offset"):
+        record.update(k="i", q=update.query, o=update.offset)
+        return record
+
+    record.update(k="m", c=update.chat.id if getattr(update, "chat", None) else None)
+    text = getattr(update, "text", None) or getattr(update, "caption", None)
+    if text:
+        record["x"] = text
+    media = (getattr(update, "document", None) or getattr(update, "video", None)
+             or getattr(update, "audio", None))
+    if media is not None:
+        record["f"] = [getattr(media, "file_unique_id", None),
+                       getattr(media, "file_name", None) or getattr(media, "title", None),
+                       getattr(media, "file_size", None), getattr(media, "mime_type", None)]
+    elif getattr(update, "photo", None) is not None:
+        record["p"] = 1
+    return record
+
+
+class UpdateRecorder:
+    """Appends every incoming update to a JSONL log for offline replay.
+
+    ``on_update`` runs as a group -1 handler, so it sees every update before
+    the real handlers and never stops them. It only enqueues a small dict; a
+    writer thread serialises and appends it, flushing when the queue runs dry.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.recorded = 0
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+
+    async def on_update(self, client, update):
+        try:
+            self.record(update)
+        except Exception as e:
+            logger.debug("Could not record update: %s", e)
+
+    def record(self, update):
+        self._queue.put(encode_update(update))
+        self.recorded += 1
+        if self._writer is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._writer = threading.Thread(target=self._write_loop, name="update-recorder", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+    def _write_loop(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                record = self._queue.get()
+                while record is not None:
+                    f.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+                    f.write("\n")
+                    try:
+                        record = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                f.flush()
+                if record is None:
+                    return
+
+    def close(self):
+        """Write everything still queued and stop the writer"""
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+
+def read_updates(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)